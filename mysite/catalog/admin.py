@@ -1,10 +1,11 @@
 from django.contrib import admin
-from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 
+from .thumbnails import picture_html
 from .models import (
     Book,
     Author,
+    CatalogStats,
     Genre,
     Language,
     Publisher,
@@ -16,12 +17,12 @@ from .models import (
 
 @admin.register(Author)
 class AuthorAdmin(admin.ModelAdmin):
-    list_display = ["last_name", "first_name", "photo", "show_photo"]
+    list_display = ["last_name", "first_name", "photo", "show_photo", "photo_status"]
     fields = ["last_name", "first_name", "about", ("date_of_birth", "photo")]
 
     @admin.display(description="Фото")
     def show_photo(self, obj: Author):
-        return format_html(f"<img src='{obj.photo.url}' style='max-height: 100px;'>")
+        return picture_html(obj.photo, "thumb", str(obj))
 
 
 class BookInstanceInline(admin.TabularInline):
@@ -30,19 +31,43 @@ class BookInstanceInline(admin.TabularInline):
 
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
-    list_display = ["title", "genre", "language", "display_author", "show_photo"]
+    list_display = [
+        "title",
+        "genre",
+        "language",
+        "display_author",
+        "show_photo",
+        "photo_status",
+    ]
+    list_select_related = ["genre", "language"]
     list_filter = ["genre", "author"]
     inlines = [BookInstanceInline]
 
     @admin.display(description="Обложка")
     def show_photo(self, obj: Book):
-        return format_html(f"<img src='{obj.photo.url}' style='max-height: 100px;'>")
+        return picture_html(obj.photo, "thumb", str(obj))
+
+
+class OverdueFilter(admin.SimpleListFilter):
+    title = "Просрочен"
+    parameter_name = "overdue"
+
+    def lookups(self, request, model_admin):
+        return [("yes", "Да")]
+
+    def queryset(self, request, queryset):
+        if self.value() == "yes":
+            return queryset.overdue()
+        return queryset
 
 
 @admin.register(BookInstance)
 class BookInstanceAdmin(admin.ModelAdmin):
-    list_display = ["book", "status", "borrower", "due_back", "id"]
-    list_filter = ["book", "status"]
+    list_display = ["book", "status", "borrower", "due_back", "show_overdue", "id"]
+    list_select_related = ["book", "status", "borrower"]
+    list_filter = [OverdueFilter, "book", "status"]
+    # Counting every instance of a large table on each page is too slow.
+    show_full_result_count = False
     fieldsets = (
         (
             "Экземпляр книги",
@@ -58,10 +83,37 @@ class BookInstanceAdmin(admin.ModelAdmin):
         ),
     )
 
+    def get_ordering(self, request):
+        # Overdue loans grouped by borrower and book, as instance_overdue_idx.
+        if request.GET.get(OverdueFilter.parameter_name) == "yes":
+            return ["borrower", "book", "due_back"]
+        return super().get_ordering(request)
+
+    @admin.display(description="Просрочен", boolean=True)
+    def show_overdue(self, obj: BookInstance):
+        return obj.is_overdue
+
 
 @admin.register(UserBookRelation)
 class UserBookRelationAdmin(admin.ModelAdmin):
-    pass
+    list_select_related = ["user", "book"]
+
+
+@admin.register(CatalogStats)
+class CatalogStatsAdmin(admin.ModelAdmin):
+    list_display = [
+        "num_books",
+        "num_instances",
+        "num_instances_available",
+        "num_authors",
+    ]
+    readonly_fields = list_display
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 admin.site.register(Genre)
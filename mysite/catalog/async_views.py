@@ -0,0 +1,112 @@
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.urls import resolve
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+
+from .conditional import conditional_response, make_etag, page_etag
+from .models import Book
+from .payload import book_payloads, render_page
+from .serializers import BookReaderSerializer, reader_relations
+from .views import BookViewSet
+
+SYNC_URLCONF = "catalog.urls"
+
+
+async def delegate(request):
+    """Serves the request with the synchronous DRF view of the same URL."""
+    match = resolve(request.path_info, urlconf=SYNC_URLCONF)
+    return await sync_to_async(match.func)(request, *match.args, **match.kwargs)
+
+
+def get_viewset(request, action: str, **kwargs) -> BookViewSet:
+    # Only builds the view and its querysets; nothing here touches the database.
+    view = BookViewSet(
+        action_map={"get": action}, args=(), kwargs=kwargs, format_kwarg=None
+    )
+    view.request = view.initialize_request(request)
+    return view
+
+
+def is_async_read(request) -> bool:
+    # Credentials and write methods go through DRF authentication as usual.
+    return request.method == "GET" and "HTTP_AUTHORIZATION" not in request.META
+
+
+async def stored_payloads(books: list[Book]) -> list[str]:
+    if any(book.payload_json is None for book in books):
+        return await sync_to_async(book_payloads)(books)
+    return [book.payload_json for book in books]
+
+
+def json_response(body) -> HttpResponse:
+    return HttpResponse(body, content_type="application/json")
+
+
+@csrf_exempt
+async def book_list(request):
+    if not is_async_read(request):
+        return await delegate(request)
+    view = get_viewset(request, "list")
+    paginator = view.paginator
+    if not view.use_payloads() or paginator is None:
+        return await delegate(request)
+    try:
+        queryset = view.filter_queryset(view.get_queryset())
+        page = await paginator.apaginate_queryset(queryset, view.request, view)
+    except APIException:
+        return await delegate(request)
+
+    etag = page_etag(page, (paginator.has_next, paginator.has_previous))
+    body = render_page(
+        paginator.get_next_link(),
+        paginator.get_previous_link(),
+        await stored_payloads(page),
+    )
+    return conditional_response(request, etag, None, lambda: json_response(body))
+
+
+@csrf_exempt
+async def book_detail(request, pk):
+    if not is_async_read(request):
+        return await delegate(request)
+    view = get_viewset(request, "retrieve", pk=pk)
+    if not view.use_payloads():
+        return await delegate(request)
+    try:
+        book = await view.get_queryset().aget(pk=pk)
+    except Book.DoesNotExist:
+        return await delegate(request)
+
+    etag = make_etag(pk, book.updated_at.timestamp())
+    payload = (await stored_payloads([book]))[0]
+    return conditional_response(
+        request, etag, book.updated_at, lambda: json_response(payload)
+    )
+
+
+@csrf_exempt
+async def book_readers(request, pk):
+    if not is_async_read(request) or not await Book.objects.filter(pk=pk).aexists():
+        return await delegate(request)
+    view = get_viewset(request, "readers", pk=pk)
+    paginator = view.paginator
+    try:
+        page = await paginator.apaginate_queryset(
+            reader_relations().filter(book_id=pk), view.request, view
+        )
+    except APIException:
+        return await delegate(request)
+
+    users = [relation.user for relation in page]
+    data = OrderedDict(
+        [
+            ("next", paginator.get_next_link()),
+            ("previous", paginator.get_previous_link()),
+            ("results", BookReaderSerializer(users, many=True).data),
+        ]
+    )
+    return json_response(JSONRenderer().render(data))
@@ -0,0 +1,4 @@
+"""
+PostgreSQL backend that hands out connections from a per-process pool
+instead of opening one for every request (see base.DatabaseWrapper).
+"""
@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import deque
+from functools import partial
+
+import psycopg2
+from django.db.backends.postgresql import base, creation
+from psycopg2 import OperationalError
+from psycopg2 import extensions
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    Connections idle for longer than ``check_after`` seconds are checked with
+    ``SELECT 1`` before reuse and replaced when the check fails. When all
+    ``max_size`` connections are in use, callers wait up to ``timeout``
+    seconds and then get an OperationalError.
+    """
+
+    def __init__(self, max_size: int, timeout: float = 10, check_after: float = 30):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+        self._stats = {
+            "connects": 0,
+            "reconnects": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+        }
+
+    def acquire(self, connect):
+        started = time.monotonic()
+        with self._condition:
+            waited = False
+            while not self._idle and self._size >= self.max_size:
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise OperationalError(
+                        f"connection pool exhausted ({self.max_size} in use)"
+                    )
+                waited = True
+                self._condition.wait(remaining)
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds"] += time.monotonic() - started
+            if self._idle:
+                connection, released_at = self._idle.pop()
+            else:
+                connection, released_at = None, None
+                self._size += 1
+
+        if connection is not None and not self._is_usable(connection, released_at):
+            connection.close()
+            connection = None
+            self._count("reconnects")
+        if connection is None:
+            try:
+                connection = connect()
+            except Exception:
+                self._forget()
+                raise
+            self._count("connects")
+        return connection
+
+    def release(self, connection) -> None:
+        if not connection.closed:
+            try:
+                self._reset(connection)
+            except psycopg2.Error:
+                # A dead connection can fail with InterfaceError too.
+                connection.close()
+        if connection.closed:
+            self._forget()
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def close_all(self) -> None:
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for connection, _ in idle:
+            connection.close()
+
+    def get_stats(self) -> dict:
+        with self._condition:
+            idle = len(self._idle)
+            return {
+                "max_size": self.max_size,
+                "in_use": self._size - idle,
+                "idle": idle,
+                **self._stats,
+            }
+
+    def _is_usable(self, connection, released_at: float) -> bool:
+        if connection.closed:
+            return False
+        if time.monotonic() - released_at < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            self._reset(connection)
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _reset(connection) -> None:
+        # Connections come back as Django closed them, possibly inside atomic()
+        # with autocommit off. Django sets up a pooled connection like a new
+        # one, which psycopg2 refuses inside a transaction.
+        if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+        if not connection.autocommit:
+            connection.autocommit = True
+
+    def _forget(self) -> None:
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _count(self, name: str) -> None:
+        with self._condition:
+            self._stats[name] += 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias: str, settings_dict: dict) -> ConnectionPool:
+    # Keyed by database name too, so the test database gets its own pool.
+    key = (alias, settings_dict["NAME"])
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**settings_dict.get("POOL", {}))
+        return _pools[key]
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections, test mirrors' included, would keep DROP
+        # DATABASE from running.
+        with _pools_lock:
+            pools = [
+                pool
+                for (_, name), pool in _pools.items()
+                if name == test_database_name
+            ]
+        for pool in pools:
+            pool.close_all()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    postgresql backend whose close() returns the connection to the pool,
+    configured by the ``POOL`` dict of the database settings.
+    """
+
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.acquire(
+            partial(super().get_new_connection, conn_params)
+        )
+        # Set by the parent only for new connections; the options are the same.
+        isolation_level = self.settings_dict["OPTIONS"].get("isolation_level")
+        self.isolation_level = (
+            base.IsolationLevel(isolation_level)
+            if isolation_level is not None
+            else base.IsolationLevel.READ_COMMITTED
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection)
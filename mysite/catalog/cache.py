@@ -0,0 +1,114 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.http import urlencode
+from rest_framework.response import Response
+
+from .routers import reads_primary, uses_shared_cache
+
+VERSION_KEY = "catalog:book:version"
+BUMPED_AT_KEY = "catalog:book:bumped_at"
+HITS_KEY = "catalog:book:hits"
+MISSES_KEY = "catalog:book:misses"
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _incr(key: str) -> int:
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def get_version() -> int:
+    return get_cache().get(VERSION_KEY, 0)
+
+
+def bump_version() -> int:
+    get_cache().set(BUMPED_AT_KEY, time.time(), timeout=None)
+    return _incr(VERSION_KEY)
+
+
+def can_store() -> bool:
+    """
+    Whether the response just read may be cached under the current version.
+    A replica may not have replayed the write that bumped it yet, so its
+    reads are cached only CATALOG_REPLICA_PIN_SECONDS after the bump, when
+    the writing client stops reading from the primary as well.
+    """
+    if reads_primary():
+        return True
+    bumped_at = get_cache().get(BUMPED_AT_KEY, 0)
+    return time.time() - bumped_at >= settings.CATALOG_REPLICA_PIN_SECONDS
+
+
+def get_stats() -> dict:
+    values = get_cache().get_many([VERSION_KEY, HITS_KEY, MISSES_KEY])
+    return {
+        "version": values.get(VERSION_KEY, 0),
+        "hits": values.get(HITS_KEY, 0),
+        "misses": values.get(MISSES_KEY, 0),
+    }
+
+
+class CachedResponseMixin:
+    """
+    Caches successful list and retrieve responses (the data of a DRF
+    Response, the body of a plain HttpResponse) under the current catalog
+    version. Any write bumps the version (see signals), so
+    stale entries are never read again and simply expire. Requests that
+    write bypass the cache, and replica reads right after a write are not
+    stored, see can_store().
+    """
+
+    cache_timeout = None
+
+    def get_cache_key(self, request) -> str | None:
+        if not uses_shared_cache():
+            return None
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        path = f"{request.get_host()}{request.path}"
+        return f"catalog:book:v{get_version()}:{path}?{query}"
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        key = self.get_cache_key(request)
+        if key is None:
+            response = handler(request, *args, **kwargs)
+            response["X-Cache"] = "BYPASS"
+            return response
+
+        cache = get_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            _incr(HITS_KEY)
+            kind, body, content_type = cached
+            if kind == "data":
+                return Response(body, headers={"X-Cache": "HIT"})
+            return HttpResponse(
+                body, content_type=content_type, headers={"X-Cache": "HIT"}
+            )
+
+        _incr(MISSES_KEY)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200 and can_store():
+            if isinstance(response, Response):
+                cached = ("data", response.data, None)
+            else:
+                cached = ("content", response.content, response["Content-Type"])
+            timeout = self.cache_timeout or settings.CATALOG_CACHE_TIMEOUT
+            cache.set(key, cached, timeout)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
@@ -0,0 +1,112 @@
+from datetime import datetime
+from functools import partial
+from hashlib import md5
+
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Author, Book, BookInstance
+
+
+def make_etag(*parts) -> str:
+    return quote_etag(md5(":".join(map(str, parts)).encode()).hexdigest())
+
+
+def conditional_response(request, etag: str, last_modified: datetime | None, handler):
+    """
+    Answers 304 when the request validators match, otherwise calls handler()
+    and stamps ETag and Last-Modified on a successful response.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    ) or handler()
+    if response.status_code in (200, 304):
+        response.headers["ETag"] = etag
+        if timestamp is not None:
+            response.headers["Last-Modified"] = http_date(timestamp)
+    return response
+
+
+def latest_updated_at(*values) -> datetime | None:
+    return max((value for value in values if value is not None), default=None)
+
+
+def page_etag(books, flags=()) -> str:
+    """
+    A list page has no Last-Modified: the newest timestamp on it does not
+    move when one of its books is deleted, the set of primary keys does.
+    """
+    return make_etag(
+        *flags, *(f"{book.pk}@{book.updated_at.timestamp()}" for book in books)
+    )
+
+
+def book_page_validators(pk, user) -> tuple[str, datetime] | None:
+    instances = (
+        BookInstance.objects.filter(book=OuterRef("pk"))
+        .order_by("-updated_at")
+        .values("updated_at")[:1]
+    )
+    authors = (
+        Author.objects.filter(book=OuterRef("pk"))
+        .order_by("-updated_at")
+        .values("updated_at")[:1]
+    )
+    row = (
+        Book.objects.filter(pk=pk)
+        .annotate(
+            instances_updated_at=Subquery(instances),
+            authors_updated_at=Subquery(authors),
+        )
+        .values_list("updated_at", "instances_updated_at", "authors_updated_at")
+        .first()
+    )
+    if row is None:
+        return None
+    last_modified = latest_updated_at(*row)
+    etag = make_etag(pk, last_modified.timestamp(), user.pk, user.get_username())
+    return etag, last_modified
+
+
+class ConditionalGetMixin:
+    """
+    Computes validators for list and retrieve from Book.updated_at alone:
+    the list ETag covers the primary keys and timestamps of the requested
+    page, the detail ETag and Last-Modified the timestamp of one row.
+    """
+
+    def get_validator_queryset(self):
+        queryset = self.get_queryset().select_related(None).prefetch_related(None)
+        return queryset.only("pk", "updated_at")
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_validator_queryset())
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if page is None:
+            page = list(queryset)
+            flags = ()
+        else:
+            flags = (paginator.has_next, paginator.has_previous)
+
+        handler = partial(super().list, request, *args, **kwargs)
+        return conditional_response(request, page_etag(page, flags), None, handler)
+
+    def retrieve(self, request, *args, **kwargs):
+        handler = partial(super().retrieve, request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            updated_at = (
+                self.get_validator_queryset()
+                .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+                .values_list("updated_at", flat=True)
+                .first()
+            )
+        except (TypeError, ValueError):
+            updated_at = None
+        if updated_at is None:
+            return handler()
+        etag = make_etag(self.kwargs[lookup_url_kwarg], updated_at.timestamp())
+        return conditional_response(request, etag, updated_at, handler)
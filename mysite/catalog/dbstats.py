@@ -0,0 +1,33 @@
+import threading
+from collections import Counter
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_opened = Counter()
+_lock = threading.Lock()
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    # A new server connection without a pool, a checkout from it with one.
+    with _lock:
+        _opened[connection.alias] += 1
+
+
+def get_db_stats() -> dict:
+    """Per-alias connection settings and counters of this process."""
+    stats = {}
+    for alias in connections:
+        wrapper = connections[alias]
+        pool = getattr(wrapper, "pool", None)
+        stats[alias] = {
+            "vendor": wrapper.vendor,
+            "pooled": pool is not None,
+            "conn_max_age": wrapper.settings_dict["CONN_MAX_AGE"],
+            "health_checks": wrapper.settings_dict["CONN_HEALTH_CHECKS"],
+            "opened": _opened[alias],
+            **(pool.get_stats() if pool is not None else {}),
+        }
+    return stats
@@ -0,0 +1,55 @@
+import json
+from collections.abc import Iterable, Iterator
+
+from django.db.models import Prefetch, QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Author, Book
+from .serializers import BookExportSerializer
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def export_queryset() -> QuerySet[Book]:
+    return (
+        Book.objects.select_related("genre", "language", "publisher")
+        .prefetch_related(
+            Prefetch("author", queryset=Author.objects.only("first_name", "last_name"))
+        )
+        .defer("search_vector", "payload_json")
+        .order_by("pk")
+    )
+
+
+def export_rows(queryset: QuerySet[Book], chunk_size: int) -> Iterator[str]:
+    # iterator() reads through a server-side cursor and runs the author
+    # prefetch once per chunk, so memory does not grow with the catalog.
+    for book in queryset.iterator(chunk_size=chunk_size):
+        yield json.dumps(
+            BookExportSerializer(book).data, cls=JSONEncoder, ensure_ascii=False
+        )
+
+
+def ndjson_stream(rows: Iterable[str]) -> Iterator[str]:
+    for row in rows:
+        yield f"{row}\n"
+
+
+def json_array_stream(rows: Iterable[str]) -> Iterator[str]:
+    separator = "["
+    for row in rows:
+        yield f"{separator}{row}"
+        separator = ",\n"
+    yield "[]" if separator == "[" else "]"
+
+
+def export_response(output: str, chunk_size: int) -> StreamingHttpResponse:
+    rows = export_rows(export_queryset(), chunk_size)
+    stream = ndjson_stream(rows) if output == "ndjson" else json_array_stream(rows)
+    response = StreamingHttpResponse(stream, content_type=CONTENT_TYPES[output])
+    response["Content-Disposition"] = f'attachment; filename="books.{output}"'
+    return response
@@ -1,9 +1,261 @@
-from django.db.models import Avg
+import time
+from collections.abc import Iterable
+from itertools import islice
 
-from .models import Book, UserBookRelation
+from django.db import connections, router, transaction
+from django.contrib.postgres.aggregates import StringAgg
+from django.db.models import (
+    Avg,
+    Case,
+    Count,
+    DecimalField,
+    F,
+    FloatField,
+    OuterRef,
+    QuerySet,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from django.db.models.lookups import GreaterThan
+
+from .cache import bump_version
+from .models import Author, Book, UserBookRelation
+
+RELATION_FIELDS = ("like", "in_bookmarks", "rate")
+RELATION_DEFAULTS = {"like": False, "in_bookmarks": False, "rate": None}
+
+# Inserts the relation with the new values or locks the existing row and
+# returns its current values; no row at all if the book does not exist.
+# xmax is 0 only for a row inserted by this statement.
+RELATION_UPSERT = """
+INSERT INTO catalog_userbookrelation (user_id, book_id, "like", in_bookmarks, rate)
+SELECT %(user)s, %(book)s, %(like)s, %(in_bookmarks)s, %(rate)s
+WHERE EXISTS (SELECT 1 FROM catalog_book WHERE id = %(book)s)
+ON CONFLICT (user_id, book_id) DO UPDATE SET user_id = EXCLUDED.user_id
+RETURNING id, "like", in_bookmarks, rate, xmax = 0
+"""
+RELATION_UPDATE = """
+UPDATE catalog_userbookrelation
+SET "like" = %(like)s, in_bookmarks = %(in_bookmarks)s, rate = %(rate)s
+WHERE id = %(id)s
+"""
+BOOK_COUNTERS_UPDATE = """
+UPDATE catalog_book SET
+    readers_count = readers_count + %(readers)s,
+    likes_count = likes_count + %(likes)s,
+    rating_sum = rating_sum + %(rating_sum)s,
+    rating_count = rating_count + %(rating_count)s,
+    rating = CASE WHEN rating_count + %(rating_count)s > 0 THEN (
+        (rating_sum + %(rating_sum)s)::float / (rating_count + %(rating_count)s)
+    )::numeric(3, 2) END,
+    updated_at = %(updated_at)s,
+    payload_json = NULL
+WHERE id = %(book)s
+"""
+
+
+def rating_expression(rating_sum, rating_count):
+    return Case(
+        When(
+            GreaterThan(rating_count, 0),
+            then=Cast(
+                Cast(rating_sum, FloatField()) / rating_count,
+                DecimalField(max_digits=3, decimal_places=2),
+            ),
+        ),
+        default=None,
+    )
+
+
+def stale_changes() -> dict:
+    # Every write that can change the API representation of a book bumps
+    # updated_at (conditional GET) and drops the stored payload_json.
+    return {"updated_at": timezone.now(), "payload_json": None}
 
 
 def set_rating(book: Book):
-    raring = UserBookRelation.objects.filter(book=book).aggregate(rating=Avg("rate")).get("rating")
-    book.rating = raring
-    book.save()
+    stats = UserBookRelation.objects.filter(book=book, rate__isnull=False).aggregate(
+        rating=Avg("rate"), rating_sum=Sum("rate"), rating_count=Count("rate")
+    )
+    book.rating = stats["rating"]
+    book.rating_sum = stats["rating_sum"] or 0
+    book.rating_count = stats["rating_count"]
+    book.save(update_fields=["rating", "rating_sum", "rating_count"])
+
+
+def update_book_counters(
+    book_id: int,
+    like_delta: int = 0,
+    old_rate: int | None = None,
+    new_rate: int | None = None,
+    readers_delta: int = 0,
+) -> None:
+    changes = stale_changes()
+    if readers_delta:
+        changes["readers_count"] = F("readers_count") + readers_delta
+    if like_delta:
+        changes["likes_count"] = F("likes_count") + like_delta
+    sum_delta = (new_rate or 0) - (old_rate or 0)
+    count_delta = (new_rate is not None) - (old_rate is not None)
+    if sum_delta or count_delta:
+        rating_sum = F("rating_sum") + sum_delta
+        rating_count = F("rating_count") + count_delta
+        changes.update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=rating_expression(rating_sum, rating_count),
+        )
+    Book.objects.filter(pk=book_id).update(**changes)
+
+
+def save_relation(
+    user_id: int, book_id: int, values: dict
+) -> UserBookRelation | None:
+    """
+    Creates or updates the relation of the user to the book and adjusts the
+    book counters in at most two statements, without the model signals.
+    The first one locks the relation row, so concurrent writes of the same
+    user are applied one after another. Returns None for a missing book.
+    """
+    relation = {**RELATION_DEFAULTS, **values, "user": user_id, "book": book_id}
+    connection = connections[router.db_for_write(UserBookRelation)]
+    with transaction.atomic(using=connection.alias, savepoint=False):
+        with connection.cursor() as cursor:
+            cursor.execute(RELATION_UPSERT, relation)
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            relation["id"], like, in_bookmarks, rate, created = row
+            if created:
+                old = {"like": False, "in_bookmarks": False, "rate": None}
+            else:
+                old = {"like": like, "in_bookmarks": in_bookmarks, "rate": rate}
+                relation = {**relation, **old, **values}
+
+            statements = []
+            if not created and any(relation[f] != old[f] for f in RELATION_FIELDS):
+                statements.append(RELATION_UPDATE)
+            counters = {
+                "readers": int(created),
+                "likes": relation["like"] - old["like"],
+                "rating_sum": (relation["rate"] or 0) - (old["rate"] or 0),
+                "rating_count": (
+                    (relation["rate"] is not None) - (old["rate"] is not None)
+                ),
+            }
+            if any(counters.values()):
+                statements.append(BOOK_COUNTERS_UPDATE)
+            if statements:
+                # Both updates go as one statement, the first as a CTE.
+                sql = statements[-1]
+                if len(statements) == 2:
+                    sql = f"WITH relation AS ({statements[0]}){statements[1]}"
+                cursor.execute(
+                    sql,
+                    {**relation, **counters, "updated_at": timezone.now()},
+                )
+    if statements:
+        bump_version()
+    instance = UserBookRelation(
+        id=relation["id"],
+        user_id=user_id,
+        book_id=book_id,
+        **{f: relation[f] for f in RELATION_FIELDS},
+    )
+    instance._loaded_values = {"like": instance.like, "rate": instance.rate}
+    return instance
+
+
+def touch_books(books: QuerySet[Book]) -> int:
+    return books.update(**stale_changes())
+
+
+def update_author_names(books: QuerySet[Book]) -> int:
+    names = (
+        Author.objects.filter(book=OuterRef("pk"))
+        .values("book")
+        .annotate(names=StringAgg("last_name", delimiter=", ", ordering="pk"))
+        .values("names")
+    )
+    return books.update(author_names=Coalesce(Subquery(names), Value("")))
+
+
+def rebuild_book_counters(books: QuerySet[Book] | None = None) -> int:
+    if books is None:
+        books = Book.objects.all()
+    relations = UserBookRelation.objects.filter(book=OuterRef("pk")).values("book")
+    readers = relations.annotate(count=Count("pk")).values("count")
+    likes = relations.filter(like=True).annotate(count=Count("pk")).values("count")
+    rates = relations.filter(rate__isnull=False)
+    rating_sum = Coalesce(
+        Subquery(rates.annotate(total=Sum("rate")).values("total")), 0
+    )
+    rating_count = Coalesce(
+        Subquery(rates.annotate(count=Count("rate")).values("count")), 0
+    )
+    return books.update(
+        readers_count=Coalesce(Subquery(readers), 0),
+        likes_count=Coalesce(Subquery(likes), 0),
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        rating=rating_expression(rating_sum, rating_count),
+        **stale_changes(),
+    )
+
+
+def upsert_relations(rows: list[dict]) -> set[int]:
+    """
+    Creates or updates the UserBookRelation of every (user, book) row in one
+    transaction and recomputes the counters of each affected book once.
+    Rows for the same pair are merged, later ones overriding only the fields
+    they carry; absent fields keep their values.
+    Rows are written with INSERT ... ON CONFLICT, one statement per set of
+    present fields, so concurrent writes of the same pair cannot collide.
+    """
+    latest = {}
+    for row in rows:
+        latest.setdefault((row["user"], row["book"]), {}).update(row)
+    book_ids = {book_id for _, book_id in latest}
+    groups = {}
+    for (user_id, book_id), row in latest.items():
+        fields = tuple(f for f in RELATION_FIELDS if f in row)
+        groups.setdefault(fields, []).append(
+            UserBookRelation(
+                user_id=user_id, book_id=book_id, **{f: row[f] for f in fields}
+            )
+        )
+
+    with transaction.atomic():
+        for fields, relations in groups.items():
+            if fields:
+                UserBookRelation.objects.bulk_create(
+                    relations,
+                    update_conflicts=True,
+                    unique_fields=["user", "book"],
+                    update_fields=fields,
+                )
+            else:
+                UserBookRelation.objects.bulk_create(relations, ignore_conflicts=True)
+        rebuild_book_counters(Book.objects.filter(pk__in=book_ids))
+    bump_version()
+    return book_ids
+
+
+def bulk_upsert_relations(rows: Iterable[dict], batch_size: int = 1000) -> dict:
+    started = time.monotonic()
+    rows_count, book_ids = 0, set()
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        book_ids |= upsert_relations(batch)
+        rows_count += len(batch)
+    seconds = time.monotonic() - started
+    return {
+        "rows": rows_count,
+        "books": len(book_ids),
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows_count / seconds) if seconds else rows_count,
+    }
@@ -0,0 +1,178 @@
+import json
+import random
+import re
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.test import Client, override_settings
+
+from catalog.cache import get_cache
+from catalog.models import Book
+
+from .benchmark_reads import HOST, percentile
+
+QUERIES = re.compile(r'desc="(\d+) queries"')
+METRICS = ("rps", "p50_ms", "p99_ms", "queries")
+
+
+def book_url(pattern: str):
+    return lambda book_id: pattern.format(pk=book_id)
+
+
+# name -> (method, URL of a book id, body of the request number)
+SCENARIOS = {
+    "book-list": ("get", book_url("/book/"), None),
+    "book-detail": ("get", book_url("/book/{pk}/"), None),
+    "book_relation": (
+        "patch",
+        book_url("/book_relation/{pk}/"),
+        lambda number: {"like": number % 2 == 0},
+    ),
+    "index": ("get", book_url("/"), None),
+    "books": ("get", book_url("/books/"), None),
+    "authors-list": ("get", book_url("/authors/"), None),
+}
+
+
+def summarize(latencies: list[float], queries: list[int], elapsed: float) -> dict:
+    latencies = [latency * 1000 for latency in latencies]
+    return {
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "queries": max(queries),
+    }
+
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Metrics of one scenario that are worse than the baseline allows. p99 is
+    reported but not checked: a few hundred requests make it too noisy.
+    """
+    worse = []
+    if result["rps"] < baseline["rps"] * (1 - tolerance):
+        worse.append("rps")
+    if result["p50_ms"] > baseline["p50_ms"] * (1 + tolerance):
+        worse.append("p50_ms")
+    if result["queries"] > baseline["queries"]:
+        worse.append("queries")
+    return worse
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет пропускную способность, задержки p50/p99 и число SQL-запросов "
+        "основных страниц и API каталога и сравнивает их с сохранённым эталоном"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=20)
+        parser.add_argument(
+            "--scenario", action="append", dest="scenarios", choices=list(SCENARIOS)
+        )
+        parser.add_argument(
+            "--cold", action="store_true", help="Очищать кэш перед каждым запросом"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--save-baseline", help="Сохранить результаты в JSON-файл")
+        parser.add_argument("--baseline", help="Сравнить с эталоном из JSON-файла")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Допустимое ухудшение скорости и задержек, доля эталона",
+        )
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.order_by("pk").first()
+        bounds = Book.objects.aggregate(first=Min("pk"), last=Max("pk"))
+        if user is None or bounds["first"] is None:
+            raise CommandError("Нет книг или пользователей, см. generate_catalog_data")
+        rng = random.Random(options["seed"])
+        candidates = {
+            rng.randint(bounds["first"], bounds["last"])
+            for _ in range(options["requests"] + options["warmup"])
+        }
+        book_ids = sorted(
+            Book.objects.filter(pk__in=candidates).values_list("pk", flat=True)
+        )
+
+        client = Client(HTTP_HOST=HOST)
+        client.force_login(user)
+        results = {}
+        with override_settings(
+            CATALOG_TIMING_SAMPLE_RATE=1,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, HOST],
+        ):
+            for name in options["scenarios"] or SCENARIOS:
+                results[name] = self.run(
+                    client, name, book_ids, options["requests"], options
+                )
+                self.report(name, results[name])
+
+        if options["save_baseline"]:
+            path = Path(options["save_baseline"])
+            path.write_text(json.dumps(results, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f"Эталон сохранён: {path}"))
+        if options["baseline"]:
+            self.compare(results, options["baseline"], options["tolerance"])
+
+    def run(self, client, name, book_ids, count, options) -> dict:
+        method, url, body = SCENARIOS[name]
+        send = getattr(client, method)
+        get_cache().clear()
+        latencies, queries = [], []
+        started = None
+        for number in range(options["warmup"] + count):
+            if number == options["warmup"]:
+                started = time.perf_counter()
+                latencies, queries = [], []
+            if options["cold"]:
+                get_cache().clear()
+            kwargs = {}
+            if body is not None:
+                kwargs = {
+                    "data": json.dumps(body(number)),
+                    "content_type": "application/json",
+                }
+            request_started = time.perf_counter()
+            response = send(url(book_ids[number % len(book_ids)]), **kwargs)
+            latencies.append(time.perf_counter() - request_started)
+            if response.status_code >= 400:
+                raise CommandError(f"{name}: ответ {response.status_code}")
+            queries.append(int(QUERIES.search(response["Server-Timing"]).group(1)))
+        return summarize(latencies, queries, time.perf_counter() - started)
+
+    def report(self, name: str, result: dict) -> None:
+        self.stdout.write(
+            f"{name:<14} {result['rps']:>8.1f} req/s  p50 {result['p50_ms']:>7.2f} ms"
+            f"  p99 {result['p99_ms']:>7.2f} ms  queries {result['queries']:>3}"
+        )
+
+    def compare(self, results: dict, path: str, tolerance: float) -> None:
+        try:
+            baseline = json.loads(Path(path).read_text())
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Не удалось прочитать эталон: {error}")
+        failed = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            changes = ", ".join(
+                f"{metric} {baseline[name][metric]} -> {result[metric]}"
+                for metric in METRICS
+            )
+            worse = regressions(result, baseline[name], tolerance)
+            if worse:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: {changes}"))
+            else:
+                self.stdout.write(f"{name}: {changes}")
+        if failed:
+            raise CommandError(f"Хуже эталона: {', '.join(failed)}")
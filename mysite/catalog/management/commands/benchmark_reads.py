@@ -0,0 +1,128 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+
+from catalog.models import Book
+
+ASGI_URLCONF = "mysite.asgi_urls"
+HOST = "localhost"
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def wsgi_get(handler: WSGIHandler, url: str) -> tuple[int, float]:
+    environ = RequestFactory(SERVER_NAME=HOST).get(url).environ
+    statuses = []
+    started = time.perf_counter()
+    body = handler(environ, lambda status, headers: statuses.append(status))
+    b"".join(body)
+    body.close()
+    return int(statuses[0].split()[0]), time.perf_counter() - started
+
+
+async def asgi_get(handler: ASGIHandler, url: str) -> tuple[int, float]:
+    parts = urlsplit(url)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "query_string": parts.query.encode(),
+        "root_path": "",
+        "headers": [(b"host", HOST.encode())],
+        "client": ("127.0.0.1", 0),
+        "server": (HOST, 80),
+    }
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    statuses = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    started = time.perf_counter()
+    await handler(scope, receive, send)
+    return statuses[0], time.perf_counter() - started
+
+
+def run_wsgi(urls: list[str], concurrency: int) -> list[tuple[int, float]]:
+    handler = WSGIHandler()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(partial(wsgi_get, handler), urls))
+
+
+async def run_asgi(urls: list[str], concurrency: int) -> list[tuple[int, float]]:
+    handler = ASGIHandler()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(url):
+        async with semaphore:
+            return await asgi_get(handler, url)
+
+    return await asyncio.gather(*(limited(url) for url in urls))
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает синхронный (WSGI) и асинхронный (ASGI) путь чтения API книг: "
+        "пропускную способность и задержки p50/p99 при разной конкурентности"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+        parser.add_argument(
+            "--url",
+            action="append",
+            dest="urls",
+            help="По умолчанию /book/ и страница первой книги",
+        )
+
+    def handle(self, *args, **options):
+        urls = options["urls"]
+        if not urls:
+            book = Book.objects.order_by("pk").only("pk").first()
+            if book is None:
+                raise CommandError("В базе нет книг")
+            urls = ["/book/", f"/book/{book.pk}/"]
+        load = [urls[i % len(urls)] for i in range(options["requests"])]
+
+        self.stdout.write("path  concurrency  req/s  p50 ms  p99 ms  errors")
+        for concurrency in options["concurrency"]:
+            started = time.perf_counter()
+            results = run_wsgi(load, concurrency)
+            self.report("sync", concurrency, results, time.perf_counter() - started)
+
+            with override_settings(ROOT_URLCONF=ASGI_URLCONF):
+                started = time.perf_counter()
+                results = asyncio.run(run_asgi(load, concurrency))
+                elapsed = time.perf_counter() - started
+            self.report("async", concurrency, results, elapsed)
+
+    def report(self, path, concurrency, results, elapsed):
+        latencies = [latency * 1000 for _, latency in results]
+        errors = sum(status >= 400 for status, _ in results)
+        self.stdout.write(
+            f"{path:<5} {concurrency:>12} {len(results) / elapsed:>6.0f} "
+            f"{statistics.median(latencies):>7.1f} "
+            f"{percentile(latencies, 0.99):>7.1f} {errors:>7}"
+        )
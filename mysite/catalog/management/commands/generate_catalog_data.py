@@ -0,0 +1,219 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.cache import bump_version
+from catalog.loginc import rebuild_book_counters, update_author_names
+from catalog.models import (
+    Author,
+    Book,
+    BookInstance,
+    Genre,
+    Language,
+    Publisher,
+    Status,
+    UserBookRelation,
+)
+from catalog.search import update_search_vector
+from catalog.stats import AVAILABLE_STATUS, reconcile_stats
+
+WORDS = (
+    "тайна лес город море война мир дом сад ночь свет тень путь река гора "
+    "звезда осень зима весна лето сердце память время дорога остров ветер"
+).split()
+FIRST_NAMES = "Анна Иван Мария Пётр Ольга Сергей Елена Николай Дарья Алексей".split()
+LAST_NAMES = "Иванов Смирнов Кузнецов Попов Соколов Лебедев Козлов Новиков".split()
+GENRES = "Роман Детектив Фантастика Поэзия История Наука Детская Биография".split()
+LANGUAGES = "Русский Английский Немецкий Французский".split()
+PUBLISHERS = [f"Издательство {i}" for i in range(1, 21)]
+STATUSES = {1: "В заказе", AVAILABLE_STATUS: "На складе", 3: "Выдан", 4: "В ремонте"}
+
+
+def batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def ensure_names(model, names) -> list[int]:
+    for name in names:
+        model.objects.get_or_create(name=name)
+    return list(model.objects.values_list("pk", flat=True))
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу синтетическими данными для нагрузочных тестов: книги, "
+        "авторы, читатели, оценки и экземпляры создаются пакетными вставками"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=1_000_000)
+        parser.add_argument("--authors", type=int, default=100_000)
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--relations", type=int, default=10_000_000)
+        parser.add_argument("--instances", type=int, default=5_000_000)
+        parser.add_argument("--authors-per-book", type=int, default=2)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options["relations"] > options["users"] * options["books"]:
+            raise CommandError("Оценок больше, чем пар читатель-книга")
+        if options["instances"] and not (options["books"] and options["users"]):
+            raise CommandError("Для экземпляров нужны книги и читатели")
+        if options["authors"] < options["authors_per_book"]:
+            raise CommandError("Авторов меньше, чем авторов у книги")
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        self.genres = ensure_names(Genre, GENRES)
+        self.languages = ensure_names(Language, LANGUAGES)
+        self.publishers = ensure_names(Publisher, PUBLISHERS)
+        if not Status.objects.exists():
+            Status.objects.bulk_create(
+                Status(pk=pk, name=name) for pk, name in STATUSES.items()
+            )
+        self.issued_statuses = list(
+            Status.objects.exclude(pk=AVAILABLE_STATUS).values_list("pk", flat=True)
+        )
+
+        user_ids = self.insert(
+            "читатели", get_user_model(), self.users(options["users"]), keep_pks=True
+        )
+        author_ids = self.insert(
+            "авторы", Author, self.authors(options["authors"]), keep_pks=True
+        )
+        book_ids = self.insert(
+            "книги", Book, self.books(options["books"]), keep_pks=True
+        )
+        self.insert(
+            "авторы книг",
+            Book.author.through,
+            self.book_authors(book_ids, author_ids, options["authors_per_book"]),
+        )
+        self.insert(
+            "оценки",
+            UserBookRelation,
+            self.relations(user_ids, book_ids, options["relations"]),
+        )
+        self.insert(
+            "экземпляры",
+            BookInstance,
+            self.instances(book_ids, user_ids, options["instances"]),
+        )
+        self.denormalize(book_ids)
+
+    def insert(self, label: str, model, objects, keep_pks: bool = False) -> list[int]:
+        """
+        Inserts the objects in batches. Returns their primary keys only with
+        keep_pks: at the default sizes the relations and instances alone
+        would hold some 15M of them.
+        """
+        started = time.monotonic()
+        rows, pks = 0, []
+        for batch in batched(objects, self.batch_size):
+            created = model.objects.bulk_create(batch)
+            rows += len(created)
+            if keep_pks:
+                pks += [obj.pk for obj in created]
+        seconds = time.monotonic() - started
+        rate = round(rows / seconds) if seconds else rows
+        self.stdout.write(f"{label}: {rows} строк, {rate} строк/с")
+        return pks
+
+    def title(self) -> str:
+        words = self.rng.choices(WORDS, k=self.rng.randint(1, 4))
+        return " ".join(words).capitalize()
+
+    def users(self, count: int):
+        prefix = f"reader_{int(time.time())}"
+        for i in range(count):
+            yield get_user_model()(
+                username=f"{prefix}_{i}",
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                password="!",
+            )
+
+    def authors(self, count: int):
+        for i in range(count):
+            yield Author(
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=f"{self.rng.choice(LAST_NAMES)}-{i}",
+                about=self.title(),
+            )
+
+    def books(self, count: int):
+        for i in range(count):
+            yield Book(
+                title=f"{self.title()} {i}",
+                genre_id=self.rng.choice(self.genres),
+                language_id=self.rng.choice(self.languages),
+                publisher_id=self.rng.choice(self.publishers),
+                year=str(self.rng.randint(1900, 2024)),
+                summary=" ".join(self.rng.choices(WORDS, k=30)),
+                isbn=f"{self.rng.randrange(10**13):013d}",
+                price=Decimal(self.rng.randint(10000, 500000)) / 100,
+            )
+
+    def book_authors(self, book_ids, author_ids, per_book: int):
+        for book_id in book_ids:
+            for author_id in self.rng.sample(author_ids, per_book):
+                yield Book.author.through(book_id=book_id, author_id=author_id)
+
+    def relations(self, user_ids, book_ids, count: int):
+        # Every user rates a distinct set of books, so (user, book) stays unique.
+        if not count:
+            return
+        per_user, extra = divmod(count, len(user_ids))
+        for index, user_id in enumerate(user_ids):
+            books = per_user + (index < extra)
+            for book_id in self.rng.sample(book_ids, books):
+                yield UserBookRelation(
+                    user_id=user_id,
+                    book_id=book_id,
+                    like=self.rng.random() < 0.3,
+                    in_bookmarks=self.rng.random() < 0.1,
+                    rate=self.rng.randint(1, 5) if self.rng.random() < 0.5 else None,
+                )
+
+    def instances(self, book_ids, user_ids, count: int):
+        today = date.today()
+        for i in range(count):
+            issued = self.rng.random() < 0.4
+            yield BookInstance(
+                book_id=self.rng.choice(book_ids),
+                inv_num=str(i),
+                status_id=(
+                    self.rng.choice(self.issued_statuses)
+                    if issued
+                    else AVAILABLE_STATUS
+                ),
+                due_back=(
+                    today + timedelta(days=self.rng.randint(-60, 60))
+                    if issued
+                    else None
+                ),
+                borrower_id=self.rng.choice(user_ids) if issued else None,
+            )
+
+    def denormalize(self, book_ids: list[int]) -> None:
+        # bulk_create skips the signals that keep these fields up to date.
+        started = time.monotonic()
+        for batch in batched(book_ids, self.batch_size):
+            books = Book.objects.filter(pk__in=batch)
+            rebuild_book_counters(books)
+            update_author_names(books)
+            update_search_vector(books)
+        reconcile_stats()
+        bump_version()
+        seconds = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Счётчики и поиск пересчитаны за {seconds:.1f} с")
+        )
@@ -0,0 +1,58 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from catalog.loginc import bulk_upsert_relations
+from catalog.serializers import RelationRowSerializer
+
+
+def validated_rows(rows, batch_size: int):
+    """
+    Validates the CSV rows like the bulk endpoint does, batch by batch;
+    empty cells are absent fields.
+    """
+    rows = iter(rows)
+    line = 2  # the first row after the header
+    while batch := list(islice(rows, batch_size)):
+        data = [{key: value for key, value in row.items() if value} for row in batch]
+        serializer = RelationRowSerializer(data=data, many=True)
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, list):
+                errors = {
+                    f"строка {line + index}": error
+                    for index, error in enumerate(errors)
+                    if error
+                }
+            errors = json.dumps(errors, ensure_ascii=False)
+            raise CommandError(f"Ошибка в данных: {errors}")
+        yield from serializer.validated_data
+        line += len(batch)
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает оценки и лайки из CSV (user,book,like,in_bookmarks,rate) "
+        "пакетами с одним пересчётом рейтинга книги на пакет"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV-файл с заголовком")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with open(options["path"], newline="", encoding="utf-8") as file:
+            rows = validated_rows(csv.DictReader(file), options["batch_size"])
+            try:
+                stats = bulk_upsert_relations(rows, options["batch_size"])
+            except IntegrityError as error:
+                raise CommandError(f"Ошибка в данных: {error}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено строк: {stats['rows']}, книг: {stats['books']}, "
+                f"{stats['rows_per_second']} строк/с"
+            )
+        )
@@ -0,0 +1,33 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from catalog.models import Author, Book
+from catalog.photos import process_photos
+from catalog.thumbnails import PhotoStatus
+
+
+class Command(BaseCommand):
+    help = (
+        "Обрабатывает фото книг и авторов, оставшиеся в очереди или с ошибкой; "
+        "с --all пересоздаёт варианты всех фото"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true")
+        parser.add_argument("--batch-size", type=int, default=20)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        results = Counter()
+        for model in (Book, Author):
+            queryset = model.objects.exclude(photo="").only("pk", "photo")
+            if not options["all"]:
+                queryset = queryset.exclude(photo_status=PhotoStatus.READY)
+            photos = [instance.photo for instance in queryset.order_by("pk")]
+            for start in range(0, len(photos), batch_size):
+                results.update(process_photos(photos[start : start + batch_size]))
+        summary = ", ".join(
+            f"{status}={results[status]}" for status in PhotoStatus.values
+        )
+        self.stdout.write(self.style.SUCCESS(f"Обработано фото: {summary}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from catalog.loginc import rebuild_book_counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает сохранённые счётчики книг (лайки и рейтинг) по таблице UserBookRelation"
+
+    def handle(self, *args, **options):
+        updated = rebuild_book_counters()
+        self.stdout.write(self.style.SUCCESS(f"Обновлено книг: {updated}"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from catalog.models import Book
+from catalog.search import update_search_vector
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает поисковый вектор книг пакетами по первичному ключу"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        last_pk, updated = 0, 0
+        while True:
+            pks = list(
+                Book.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[: options["batch_size"]]
+            )
+            if not pks:
+                break
+            updated += update_search_vector(Book.objects.filter(pk__in=pks))
+            last_pk = pks[-1]
+        self.stdout.write(self.style.SUCCESS(f"Обновлено книг: {updated}"))
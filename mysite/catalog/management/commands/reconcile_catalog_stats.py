@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from catalog.stats import reconcile_stats
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает таблицу статистики каталога (книги, экземпляры, авторы)"
+
+    def handle(self, *args, **options):
+        counts = reconcile_stats()
+        summary = ", ".join(f"{name}={value}" for name, value in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Статистика обновлена: {summary}"))
@@ -0,0 +1,95 @@
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from .routers import end_request, read_replicas, start_request
+from .timing import end_timing, log_timings, start_timing
+
+PRIMARY_COOKIE = "catalog_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _start(request):
+    return start_request(
+        safe=request.method in SAFE_METHODS,
+        pinned=PRIMARY_COOKIE in request.COOKIES,
+    )
+
+
+def _finish(request, response, state):
+    # The client reads its own writes from the primary until replicas catch up.
+    if (
+        state.wrote
+        and request.method not in SAFE_METHODS
+        and read_replicas()
+    ):
+        response.set_cookie(
+            PRIMARY_COOKIE,
+            "1",
+            max_age=settings.CATALOG_REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite="Lax",
+        )
+    return response
+
+
+@sync_and_async_middleware
+def ReplicaMiddleware(get_response):
+    """Chooses the database for the reads of each request, see catalog.routers."""
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            state = _start(request)
+            try:
+                response = await get_response(request)
+            finally:
+                end_request()
+            return _finish(request, response, state)
+
+    else:
+
+        def middleware(request):
+            state = _start(request)
+            try:
+                response = get_response(request)
+            finally:
+                end_request()
+            return _finish(request, response, state)
+
+    return middleware
+
+
+@sync_and_async_middleware
+def TimingMiddleware(get_response):
+    """
+    Adds a Server-Timing header and a catalog.timing log record with the SQL,
+    serializer and template timings to a sample of the requests, see
+    CATALOG_TIMING_SAMPLE_RATE.
+    """
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            timings = start_timing()
+            if timings is None:
+                return await get_response(request)
+            try:
+                response = await get_response(request)
+            finally:
+                end_timing()
+            log_timings(request, response, timings)
+            return response
+
+    else:
+
+        def middleware(request):
+            timings = start_timing()
+            if timings is None:
+                return get_response(request)
+            try:
+                response = get_response(request)
+            finally:
+                end_timing()
+            log_timings(request, response, timings)
+            return response
+
+    return middleware
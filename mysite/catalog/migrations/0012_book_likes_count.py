@@ -0,0 +1,33 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_likes_count(apps, schema_editor):
+    Book = apps.get_model("catalog", "Book")
+    UserBookRelation = apps.get_model("catalog", "UserBookRelation")
+    likes = (
+        UserBookRelation.objects.filter(book=OuterRef("pk"), like=True)
+        .values("book")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Book.objects.update(likes_count=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_alter_book_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_totals(apps, schema_editor):
+    Book = apps.get_model("catalog", "Book")
+    UserBookRelation = apps.get_model("catalog", "UserBookRelation")
+    rates = UserBookRelation.objects.filter(
+        book=OuterRef("pk"), rate__isnull=False
+    ).values("book")
+    Book.objects.update(
+        rating_sum=Coalesce(
+            Subquery(rates.annotate(total=Sum("rate")).values("total")), 0
+        ),
+        rating_count=Coalesce(
+            Subquery(rates.annotate(count=Count("rate")).values("count")), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_book_likes_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='rating',
+            field=models.DecimalField(decimal_places=2, default=None, editable=False, max_digits=3, null=True),
+        ),
+        migrations.RunPython(fill_rating_totals, migrations.RunPython.noop),
+    ]
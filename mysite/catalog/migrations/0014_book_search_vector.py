@@ -0,0 +1,57 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:59
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Concat
+
+
+def fill_search_vector(apps, schema_editor):
+    Book = apps.get_model("catalog", "Book")
+    Author = apps.get_model("catalog", "Author")
+    author_names = (
+        Author.objects.filter(book=OuterRef("pk"))
+        .values("book")
+        .annotate(
+            names=StringAgg(
+                Concat("first_name", Value(" "), "last_name"), delimiter=" "
+            )
+        )
+        .values("names")
+    )
+    Book.objects.update(
+        search_vector=SearchVector("title", weight="A", config="russian")
+        + SearchVector(Subquery(author_names), weight="B", config="russian")
+        + SearchVector("summary", weight="C", config="russian")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0013_book_rating_sum_rating_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='book',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='book_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='book_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_readers_count(apps, schema_editor):
+    Book = apps.get_model("catalog", "Book")
+    UserBookRelation = apps.get_model("catalog", "UserBookRelation")
+    readers = (
+        UserBookRelation.objects.filter(book=OuterRef("pk"))
+        .values("book")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Book.objects.update(readers_count=Coalesce(Subquery(readers), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0015_author_updated_at_book_updated_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='readers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='userbookrelation',
+            index=models.Index(fields=['book', 'id'], name='relation_book_id_idx'),
+        ),
+        migrations.RunPython(fill_readers_count, migrations.RunPython.noop),
+    ]
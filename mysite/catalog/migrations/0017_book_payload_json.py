@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0016_book_readers_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='payload_json',
+            field=models.TextField(editable=False, null=True),
+        ),
+    ]
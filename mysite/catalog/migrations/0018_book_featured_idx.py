@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0017_book_payload_json'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-likes_count', 'id'], name='book_featured_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+def fill_catalog_stats(apps, schema_editor):
+    Author = apps.get_model("catalog", "Author")
+    Book = apps.get_model("catalog", "Book")
+    BookInstance = apps.get_model("catalog", "BookInstance")
+    CatalogStats = apps.get_model("catalog", "CatalogStats")
+    CatalogStats.objects.update_or_create(
+        pk=1,
+        defaults={
+            "num_books": Book.objects.count(),
+            "num_instances": BookInstance.objects.count(),
+            "num_instances_available": BookInstance.objects.filter(status=2).count(),
+            "num_authors": Author.objects.count(),
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0018_book_featured_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('num_books', models.IntegerField(default=0, verbose_name='Количество книг')),
+                ('num_instances', models.IntegerField(default=0, verbose_name='Количество экземпляров')),
+                ('num_instances_available', models.IntegerField(default=0, verbose_name='Экземпляров в наличии')),
+                ('num_authors', models.IntegerField(default=0, verbose_name='Количество авторов')),
+            ],
+            options={
+                'verbose_name': 'Статистика каталога',
+                'verbose_name_plural': 'Статистика каталога',
+            },
+        ),
+        migrations.RunPython(fill_catalog_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:12
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_author_names(apps, schema_editor):
+    Author = apps.get_model("catalog", "Author")
+    Book = apps.get_model("catalog", "Book")
+    names = (
+        Author.objects.filter(book=OuterRef("pk"))
+        .values("book")
+        .annotate(names=StringAgg("last_name", delimiter=", ", ordering="pk"))
+        .values("names")
+    )
+    Book.objects.update(author_names=Coalesce(Subquery(names), Value("")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0019_catalogstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='author_names',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_author_names, migrations.RunPython.noop),
+    ]
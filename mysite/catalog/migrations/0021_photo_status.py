@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0020_book_author_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='photo_status',
+            field=models.CharField(choices=[('pending', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка обработки')], default='ready', editable=False, max_length=10, verbose_name='Обработка фото'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='photo_status',
+            field=models.CharField(choices=[('pending', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка обработки')], default='ready', editable=False, max_length=10, verbose_name='Обработка обложки'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:37
+
+from django.db import migrations
+from django.db.models import Count, DecimalField, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, Now, NullIf
+
+
+def merge_duplicate_relations(apps, schema_editor):
+    """
+    Concurrent get_or_create() calls could store the same (user, book) pair
+    twice. Keeps the newest row with the likes and bookmarks of all of them
+    and the latest rating, then recounts the affected books.
+    """
+    Book = apps.get_model("catalog", "Book")
+    UserBookRelation = apps.get_model("catalog", "UserBookRelation")
+    duplicates = (
+        UserBookRelation.objects.values("user", "book")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+    )
+    book_ids = set()
+    for pair in duplicates.iterator():
+        rows = list(
+            UserBookRelation.objects.filter(user=pair["user"], book=pair["book"])
+            .order_by("pk")
+        )
+        kept = rows[-1]
+        kept.like = any(row.like for row in rows)
+        kept.in_bookmarks = any(row.in_bookmarks for row in rows)
+        rates = [row.rate for row in rows if row.rate is not None]
+        kept.rate = rates[-1] if rates else None
+        kept.save()
+        UserBookRelation.objects.filter(pk__in=[row.pk for row in rows[:-1]]).delete()
+        book_ids.add(pair["book"])
+    if not book_ids:
+        return
+
+    relations = UserBookRelation.objects.filter(book=OuterRef("pk")).values("book")
+    rates = relations.filter(rate__isnull=False)
+    rating_sum = Coalesce(
+        Subquery(rates.annotate(total=Sum("rate")).values("total")), 0
+    )
+    rating_count = Coalesce(
+        Subquery(rates.annotate(count=Count("rate")).values("count")), 0
+    )
+    Book.objects.filter(pk__in=book_ids).update(
+        readers_count=Coalesce(
+            Subquery(relations.annotate(count=Count("pk")).values("count")), 0
+        ),
+        likes_count=Coalesce(
+            Subquery(
+                relations.filter(like=True).annotate(count=Count("pk")).values("count")
+            ),
+            0,
+        ),
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        rating=Cast(
+            Cast(rating_sum, FloatField()) / NullIf(rating_count, 0),
+            DecimalField(max_digits=3, decimal_places=2),
+        ),
+        updated_at=Now(),
+        payload_json=None,
+    )
+
+
+class Migration(migrations.Migration):
+    # Separate from AddConstraint in 0023_lookup_indexes: on PostgreSQL,
+    # altering a table in the transaction that changed its rows can fail
+    # with "pending trigger events".
+
+    dependencies = [
+        ('catalog', '0021_photo_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_relations, migrations.RunPython.noop),
+    ]
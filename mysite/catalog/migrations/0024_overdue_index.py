@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0023_lookup_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookinstance',
+            index=models.Index(condition=models.Q(('borrower__isnull', False)), fields=['borrower', 'book', 'due_back'], name='instance_overdue_idx'),
+        ),
+    ]
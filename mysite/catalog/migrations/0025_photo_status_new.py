@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+
+def mark_photos_new(apps, schema_editor):
+    """
+    Variants used to be named without the original extension, so no photo
+    has them under the current names; they are rendered again on first use.
+    """
+    for model_name in ("Author", "Book"):
+        model = apps.get_model("catalog", model_name)
+        model.objects.exclude(photo="").exclude(photo__isnull=True).filter(
+            photo_status="ready"
+        ).update(photo_status="new")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0024_overdue_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='author',
+            name='photo_status',
+            field=models.CharField(choices=[('new', 'Не обработано'), ('pending', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка обработки')], default='new', editable=False, max_length=10, verbose_name='Обработка фото'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='photo_status',
+            field=models.CharField(choices=[('new', 'Не обработано'), ('pending', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка обработки')], default='new', editable=False, max_length=10, verbose_name='Обработка обложки'),
+        ),
+        migrations.RunPython(mark_photos_new, migrations.RunPython.noop),
+    ]
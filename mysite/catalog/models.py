@@ -1,9 +1,13 @@
 from datetime import date
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
+from .thumbnails import PhotoStatus, PhotoVariantsMixin
+
 
 class Genre(models.Model):
     name = models.CharField(
@@ -38,7 +42,7 @@ class Publisher(models.Model):
         return self.name
 
 
-class Author(models.Model):
+class Author(PhotoVariantsMixin, models.Model):
     first_name = models.CharField(
         max_length=100,
         help_text="Введите имя автора",
@@ -66,12 +70,34 @@ class Author(models.Model):
         null=True,
         blank=True,
     )
+    photo_status = models.CharField(
+        max_length=10,
+        choices=PhotoStatus.choices,
+        default=PhotoStatus.NEW,
+        editable=False,
+        verbose_name="Обработка фото",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.last_name
 
 
-class Book(models.Model):
+class Book(PhotoVariantsMixin, models.Model):
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="book_search_vector_idx"),
+            GinIndex(
+                fields=["title"], opclasses=["gin_trgm_ops"], name="book_title_trgm_idx"
+            ),
+            models.Index(fields=["-likes_count", "id"], name="book_featured_idx"),
+            # Keyset pages ordered by title or year end with the pk.
+            models.Index(fields=["title", "id"], name="book_title_id_idx"),
+            models.Index(fields=["year", "id"], name="book_year_id_idx"),
+            models.Index(fields=["price"], name="book_price_idx"),
+        ]
+
     title = models.CharField(
         max_length=200,
         help_text="Введите название книги",
@@ -134,6 +160,13 @@ class Book(models.Model):
         verbose_name="Изображение обложки",
         blank=True,
     )
+    photo_status = models.CharField(
+        max_length=10,
+        choices=PhotoStatus.choices,
+        default=PhotoStatus.NEW,
+        editable=False,
+        verbose_name="Обработка обложки",
+    )
     owner = models.ForeignKey(
         get_user_model(),
         on_delete=models.SET_NULL,
@@ -147,18 +180,33 @@ class Book(models.Model):
     )
 
     rating = models.DecimalField(
-        max_digits=3, decimal_places=2, default=None, null=True
+        max_digits=3, decimal_places=2, default=None, null=True, editable=False
     )
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    readers_count = models.PositiveIntegerField(default=0, editable=False)
+    author_names = models.TextField(default="", blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    payload_json = models.TextField(null=True, editable=False)
 
     def __str__(self) -> str:
         return self.title
 
+    def save(self, *args, **kwargs) -> None:
+        self.payload_json = None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "updated_at", "payload_json"}
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         # return reverse("book-detail", args=[str(self.id)])
         return reverse("book-detail", kwargs={"pk": self.pk})
 
     def display_author(self):
-        return ", ".join([author.last_name for author in self.author.all()])
+        return self.author_names
 
     display_author.short_description = "Авторы"
 
@@ -174,10 +222,45 @@ class Status(models.Model):
         return self.name
 
 
+class BookInstanceQuerySet(models.QuerySet):
+    def overdue(self, on: date | None = None) -> "BookInstanceQuerySet":
+        """Issued instances whose due_back has passed, see is_overdue."""
+        return self.filter(borrower__isnull=False, due_back__lt=on or date.today())
+
+    def overdue_loans(self, on: date | None = None) -> models.QuerySet:
+        """
+        Overdue instances grouped by borrower and book in the order of
+        instance_overdue_idx, with their number and the earliest due_back.
+        """
+        return (
+            self.overdue(on)
+            .order_by()
+            .values("borrower", "book")
+            .annotate(
+                instances=models.Count("pk"), first_due_back=models.Min("due_back")
+            )
+            .order_by("borrower", "book")
+        )
+
+
 class BookInstance(models.Model):
 
     class Meta:
         ordering = ["due_back"]
+        indexes = [
+            models.Index(
+                fields=["borrower", "status", "due_back"],
+                name="instance_borrower_status_idx",
+            ),
+            # Only issued instances, grouped as in overdue_loans().
+            models.Index(
+                fields=["borrower", "book", "due_back"],
+                condition=models.Q(borrower__isnull=False),
+                name="instance_overdue_idx",
+            ),
+        ]
+
+    objects = BookInstanceQuerySet.as_manager()
 
     book = models.ForeignKey(
         "Book",
@@ -209,10 +292,17 @@ class BookInstance(models.Model):
         verbose_name="Заказчик",
         help_text="Веберите заказчика книги",
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     @property
     def is_overdue(self):
-        if self.due_back and date.today() > self.due_back:
+        if self.borrower_id and self.due_back and date.today() > self.due_back:
             return True
         return False
 
@@ -221,6 +311,15 @@ class BookInstance(models.Model):
 
 
 class UserBookRelation(models.Model):
+
+    class Meta:
+        indexes = [models.Index(fields=["book", "id"], name="relation_book_id_idx")]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "book"], name="relation_user_book_unique"
+            ),
+        ]
+
     RATE_CHOICES = (
         (1, "OK"),
         (2, "Fine"),
@@ -237,12 +336,49 @@ class UserBookRelation(models.Model):
     def __str__(self) -> str:
         return f"{self.user.username}: {self.book!r} rate -> {self.rate}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def save(self, *args, **kwargs) -> None:
-        from .loginc import set_rating
+        from .loginc import update_book_counters
 
         creating = not self.pk
-        old_rating = self.rate
+        loaded = getattr(self, "_loaded_values", {})
+        old_like = False if creating else loaded.get("like", self.like)
+        old_rating = None if creating else loaded.get("rate", self.rate)
         super().save(*args, **kwargs)
-        new_raring = self.rate
-        if old_rating != new_raring or creating:
-            set_rating(self.book)
+        if creating or old_like != self.like or old_rating != self.rate:
+            update_book_counters(
+                self.book_id,
+                self.like - old_like,
+                old_rating,
+                self.rate,
+                readers_delta=int(creating),
+            )
+        self._loaded_values = {"like": self.like, "rate": self.rate}
+
+
+class CatalogStats(models.Model):
+    """
+    Single row of catalog counters kept up to date by signals
+    (see catalog.stats); reconcile_catalog_stats repairs drift.
+    """
+
+    class Meta:
+        verbose_name = "Статистика каталога"
+        verbose_name_plural = "Статистика каталога"
+
+    num_books = models.IntegerField(default=0, verbose_name="Количество книг")
+    num_instances = models.IntegerField(
+        default=0, verbose_name="Количество экземпляров"
+    )
+    num_instances_available = models.IntegerField(
+        default=0, verbose_name="Экземпляров в наличии"
+    )
+    num_authors = models.IntegerField(default=0, verbose_name="Количество авторов")
+
+    def __str__(self) -> str:
+        return "Статистика каталога"
@@ -0,0 +1,186 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from operator import attrgetter, itemgetter
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination by the values of the ordering fields plus the primary key.
+
+    Unlike CursorPagination it never falls back to OFFSET on duplicate values,
+    so any page costs the same as the first one. Ordering fields must be
+    non-null columns or annotations of the queryset itself. Rows may be model
+    instances or values() dicts; set tie_breaker to None when the ordering is
+    unique already, e.g. the GROUP BY columns of an aggregate.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    ordering = ("pk",)
+    tie_breaker = "pk"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.set_page([obj async for obj in queryset.aiterator()])
+
+    def get_page_queryset(self, queryset, request):
+        """The page plus one lookahead row, as an unevaluated queryset."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        self.cursor_values, self.reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self._invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if self.cursor_values is not None:
+            queryset = queryset.filter(self._after(ordering, self.cursor_values))
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = bool(self.page), has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor_values is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                page_size = int(request.query_params[self.page_size_query_param])
+                if page_size > 0:
+                    return min(page_size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, queryset):
+        # Filter backends (OrderingFilter, search ranking) have already
+        # ordered the queryset; only the pk tie-breaker is added here.
+        ordering = queryset.query.order_by
+        if not ordering and queryset.query.default_ordering:
+            ordering = queryset.query.get_meta().ordering
+        if not all(isinstance(field, str) for field in ordering):
+            ordering = None
+        ordering = list(ordering or self.ordering)
+        if self.tie_breaker is None:
+            return ordering
+        if not any(field.lstrip("-") in ("pk", "id") for field in ordering):
+            ordering.append(self.tie_breaker)
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        get = itemgetter if isinstance(instance, dict) else attrgetter
+        values = [
+            self._json_value(get(field.lstrip("-"))(instance))
+            for field in self.ordering
+        ]
+        data = json.dumps({"v": values, "r": int(reverse)}, separators=(",", ":"))
+        cursor = base64.urlsafe_b64encode(data.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values, reverse = data["v"], bool(data["r"])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def _json_value(value):
+        if isinstance(value, (int, str)):
+            return value
+        return str(value)
+
+    @staticmethod
+    def _after(ordering, values):
+        # (a, b, pk) > (x, y, z) expanded for mixed directions; the leading
+        # range condition lets the planner use an index on the first field.
+        first = ordering[0]
+        bound = "lte" if first.startswith("-") else "gte"
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return Q(**{f"{first.lstrip('-')}__{bound}": values[0]}) & condition
+
+
+class OverdueLoanPagination(KeysetPagination):
+    # overdue_loans() rows are unique by (borrower, book).
+    tie_breaker = None
@@ -0,0 +1,103 @@
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.fields.files import FieldFile
+
+from .cache import bump_version
+from .loginc import stale_changes
+from .thumbnails import PhotoStatus, render_photo, store_photo
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.CATALOG_IMAGE_WORKERS)
+    return _executor
+
+
+def read_photo(photo: FieldFile) -> bytes:
+    with photo.storage.open(photo.name, "rb") as file:
+        return file.read()
+
+
+def apply_result(photo: FieldFile, future: Future) -> str | None:
+    """
+    Stores the rendered photo and records the outcome in photo_status,
+    marking the cached pages and payloads with the old markup stale.
+    Skipped when the photo was replaced while it was being processed.
+    """
+    model = type(photo.instance)
+    current = model.objects.filter(pk=photo.instance.pk, photo=photo.name)
+    if not current.exists():
+        return None
+    try:
+        original, variants = future.result()
+        store_photo(photo, original, variants)
+        status = PhotoStatus.READY
+    except Exception:
+        logger.exception("Cannot process photo %s", photo.name)
+        status = PhotoStatus.FAILED
+    changes = {"photo_status": status, **stale_changes()}
+    if not hasattr(model, "payload_json"):
+        del changes["payload_json"]
+    if current.exclude(photo_status=status).update(**changes):
+        bump_version()
+    return status
+
+
+def _apply_in_callback(photo: FieldFile, caller: int, future: Future) -> None:
+    try:
+        apply_result(photo, future)
+    finally:
+        # Done callbacks usually run in the executor's thread, which has a
+        # database connection of its own.
+        if threading.get_ident() != caller:
+            connection.close()
+
+
+def render_future(photo: FieldFile) -> Future:
+    """render_photo() of the photo in the worker pool, or inline without workers."""
+    future = Future()
+    try:
+        data = read_photo(photo)
+    except OSError as error:
+        future.set_exception(error)
+        return future
+    if settings.CATALOG_IMAGE_WORKERS:
+        return get_executor().submit(render_photo, data)
+    try:
+        future.set_result(render_photo(data))
+    except Exception as error:
+        future.set_exception(error)
+    return future
+
+
+def submit_photo(photo: FieldFile) -> Future:
+    future = render_future(photo)
+    future.add_done_callback(
+        partial(_apply_in_callback, photo, threading.get_ident())
+    )
+    return future
+
+
+def process_photos(photos: list[FieldFile]) -> list[str | None]:
+    """Renders the photos in parallel and stores them from the calling thread."""
+    futures = [render_future(photo) for photo in photos]
+    return [apply_result(photo, future) for photo, future in zip(photos, futures)]
+
+
+def enqueue_photo(instance) -> None:
+    """
+    Processes instance.photo in a worker process once the current
+    transaction commits; photo_status stays pending until then.
+    """
+    photo = type(instance)(pk=instance.pk, photo=instance.photo.name).photo
+    transaction.on_commit(partial(submit_photo, photo))
@@ -0,0 +1,96 @@
+import random
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+
+# Catalog models whose reads can be served by a replica.
+REPLICA_MODELS = {
+    "catalog.author",
+    "catalog.book",
+    "catalog.bookinstance",
+    "catalog.catalogstats",
+    "catalog.userbookrelation",
+}
+
+
+@dataclass
+class ReadState:
+    """Where the reads of the current request go; set by ReplicaMiddleware."""
+
+    replica: str | None
+    safe: bool = True
+    pinned: bool = False
+    wrote: bool = False
+
+
+_state: ContextVar[ReadState | None] = ContextVar("catalog_read_state", default=None)
+
+
+def read_replicas() -> list[str]:
+    """The replicas safe requests may read from, see CATALOG_REPLICA_READS."""
+    return settings.CATALOG_DB_REPLICAS if settings.CATALOG_REPLICA_READS else []
+
+
+def start_request(safe: bool, pinned: bool) -> ReadState:
+    """
+    Reads of a safe request go to one replica picked for the whole request,
+    unless the client wrote recently. Everything else reads from the primary.
+    """
+    replicas = read_replicas()
+    replica = random.choice(replicas) if safe and not pinned and replicas else None
+    state = ReadState(replica, safe=safe, pinned=pinned)
+    _state.set(state)
+    return state
+
+
+def end_request() -> None:
+    _state.set(None)
+
+
+def uses_shared_cache() -> bool:
+    """
+    Whether the current request may read and fill the shared response cache:
+    not when it writes, as the version it would cache under is about to move.
+    """
+    state = _state.get()
+    return state is None or state.safe and not state.wrote
+
+
+def reads_primary() -> bool:
+    state = _state.get()
+    return state is None or state.replica is None
+
+
+class ReplicaRouter:
+    """
+    Sends reads of the catalog models to the replica chosen for the request.
+    Writes, and every read after a write in the same request, use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None:
+            return None
+        if model._meta.label_lower in REPLICA_MODELS:
+            return state.replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.replica = None
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *settings.CATALOG_DB_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication.
+        if db in settings.CATALOG_DB_REPLICAS:
+            return False
+        return None
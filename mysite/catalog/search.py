@@ -0,0 +1,69 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.core.exceptions import ValidationError
+from django.db.models import FloatField, OuterRef, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Cast, Concat
+from rest_framework.filters import SearchFilter
+
+from .models import Author, Book
+
+SEARCH_CONFIG = "russian"
+
+
+def book_search_vector() -> SearchVector:
+    author_names = (
+        Author.objects.filter(book=OuterRef("pk"))
+        .values("book")
+        .annotate(
+            names=StringAgg(
+                Concat("first_name", Value(" "), "last_name"), delimiter=" "
+            )
+        )
+        .values("names")
+    )
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(Subquery(author_names), weight="B", config=SEARCH_CONFIG)
+        + SearchVector("summary", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(books: QuerySet[Book]) -> int:
+    return books.update(search_vector=book_search_vector())
+
+
+class BookSearchFilter(SearchFilter):
+    """
+    Full-text search over Book.search_vector ranked by relevance, with a
+    trigram match on the title for misspelled queries. Numeric terms also
+    match the price exactly, as the old ``search_fields`` did, when they
+    fit the price column.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        text = " ".join(terms)
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+        condition = Q(search_vector=query) | Q(title__trigram_similar=text)
+        price_field = Book._meta.get_field("price")
+        for term in terms:
+            # Only numbers that fit the column: 1e999999 overflows numeric.
+            try:
+                price = price_field.clean(term, None)
+            except ValidationError:
+                continue
+            condition |= Q(price=price)
+
+        rank = Cast(
+            SearchRank("search_vector", query) + TrigramSimilarity("title", text),
+            FloatField(),
+        )
+        return queryset.filter(condition).annotate(rank=rank).order_by("-rank", "pk")
@@ -1,25 +1,47 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch, QuerySet
 
-from .models import Book, UserBookRelation
+from .models import Author, Book, UserBookRelation
+from .timing import TimedSerializerMixin
 
 
-class BookReaderSerializer(serializers.ModelSerializer):
+READERS_PREVIEW = 5
+
+
+class BookReaderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
         fields = ("first_name", "last_name")
 
 
-class BookSerializer(serializers.ModelSerializer):
+def reader_relations() -> QuerySet[UserBookRelation]:
+    return (
+        UserBookRelation.objects.select_related("user")
+        .only("book", "user__first_name", "user__last_name")
+        .order_by("pk")
+    )
+
+
+def readers_prefetch(limit: int) -> Prefetch:
+    return Prefetch(
+        "userbookrelation_set",
+        queryset=reader_relations()[:limit],
+        to_attr="reader_relations",
+    )
+
+
+class BookSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     # likes_count = SerializerMethodField()
-    annotated_likes = serializers.IntegerField(read_only=True)
+    annotated_likes = serializers.IntegerField(source="likes_count", read_only=True)
     rating = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
     owner_name = serializers.CharField(
         source="owner.username",
         default="",
         read_only=True,
     )
-    readers = BookReaderSerializer(many=True, read_only=True)
+    readers_count = serializers.IntegerField(read_only=True)
+    readers = serializers.SerializerMethodField()
 
     class Meta:
         model = Book
@@ -33,14 +55,103 @@ class BookSerializer(serializers.ModelSerializer):
             "annotated_likes",
             "rating",
             "owner_name",
+            "readers_count",
             "readers",
         )
 
+    def get_readers(self, instance):
+        limit = self.context.get("readers_preview", READERS_PREVIEW)
+        if not limit:
+            return []
+        relations = getattr(instance, "reader_relations", None)
+        if relations is None:
+            relations = reader_relations().filter(book=instance)[:limit]
+        users = [relation.user for relation in relations[:limit]]
+        return BookReaderSerializer(users, many=True).data
+
     # def get_likes_count(self, instance):
     # return UserBookRelation.objects.filter(book=instance, like=True).count()
 
 
-class UserBookRelationSerializer(serializers.ModelSerializer):
+class ExportAuthorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Author
+        fields = ("first_name", "last_name")
+
+
+class BookExportSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    genre = serializers.StringRelatedField()
+    language = serializers.StringRelatedField()
+    publisher = serializers.StringRelatedField()
+    authors = ExportAuthorSerializer(source="author", many=True, read_only=True)
+
+    class Meta:
+        model = Book
+        fields = (
+            "id",
+            "title",
+            "year",
+            "summary",
+            "isbn",
+            "price",
+            "genre",
+            "language",
+            "publisher",
+            "authors",
+            "likes_count",
+            "rating",
+        )
+
+
+class UserBookRelationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = UserBookRelation
         fields = ("book", "like", "in_bookmarks", "rate")
+
+
+class RelationRowListSerializer(serializers.ListSerializer):
+    def validate(self, attrs):
+        for field, model in (("user", get_user_model()), ("book", Book)):
+            ids = {row[field] for row in attrs}
+            found = set(model.objects.filter(pk__in=ids).values_list("pk", flat=True))
+            if ids - found:
+                raise serializers.ValidationError(
+                    {field: f"Не найдены: {sorted(ids - found)}"}
+                )
+        return attrs
+
+
+class RelationRowSerializer(serializers.Serializer):
+    user = serializers.IntegerField()
+    book = serializers.IntegerField()
+    like = serializers.BooleanField(required=False)
+    in_bookmarks = serializers.BooleanField(required=False)
+    rate = serializers.ChoiceField(
+        choices=UserBookRelation.RATE_CHOICES, allow_null=True, required=False
+    )
+
+    class Meta:
+        list_serializer_class = RelationRowListSerializer
+
+
+def add_loan_names(loans: list[dict]) -> list[dict]:
+    """Adds the borrower username and the book title to overdue_loans() rows."""
+    users = (
+        get_user_model()
+        .objects.only("username")
+        .in_bulk({loan["borrower"] for loan in loans})
+    )
+    books = Book.objects.only("title").in_bulk({loan["book"] for loan in loans})
+    for loan in loans:
+        loan["username"] = users[loan["borrower"]].username
+        loan["title"] = books[loan["book"]].title
+    return loans
+
+
+class OverdueLoanSerializer(TimedSerializerMixin, serializers.Serializer):
+    borrower = serializers.IntegerField()
+    username = serializers.CharField()
+    book = serializers.IntegerField()
+    title = serializers.CharField()
+    instances = serializers.IntegerField()
+    first_due_back = serializers.DateField()
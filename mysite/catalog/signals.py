@@ -0,0 +1,190 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from django_cleanup.signals import cleanup_pre_delete
+
+from .cache import bump_version
+from .loginc import touch_books, update_author_names, update_book_counters
+from .models import (
+    Author,
+    Book,
+    BookInstance,
+    Genre,
+    Language,
+    Publisher,
+    Status,
+    UserBookRelation,
+)
+from .search import update_search_vector
+from .stats import AVAILABLE_STATUS, adjust_stats
+from .photos import enqueue_photo
+from .thumbnails import PhotoStatus, delete_variants
+
+SEARCH_FIELDS = {"title", "summary"}
+READER_FIELDS = {"username", "first_name", "last_name"}
+
+
+@receiver(post_delete, sender=UserBookRelation)
+def relation_deleted(sender, instance: UserBookRelation, **kwargs):
+    update_book_counters(
+        instance.book_id, -instance.like, instance.rate, None, readers_delta=-1
+    )
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance: Book, update_fields=None, **kwargs):
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        update_search_vector(Book.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance: Author, created, **kwargs):
+    if not created:
+        books = Book.objects.filter(author=instance)
+        update_search_vector(books)
+        update_author_names(books)
+
+
+@receiver(pre_delete, sender=Author)
+def author_deleting(sender, instance: Author, **kwargs):
+    instance._book_ids = list(instance.book_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance: Author, **kwargs):
+    books = Book.objects.filter(pk__in=instance._book_ids)
+    update_search_vector(books)
+    update_author_names(books)
+    touch_books(books)
+
+
+@receiver(m2m_changed, sender=Book.author.through)
+def book_authors_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        books = Book.objects.filter(pk=instance.pk)
+    elif action == "pre_clear":
+        instance._book_ids = list(instance.book_set.values_list("pk", flat=True))
+        return
+    elif action == "post_clear":
+        books = Book.objects.filter(pk__in=instance._book_ids)
+    else:
+        books = Book.objects.filter(pk__in=pk_set)
+    if action in ("post_add", "post_remove", "post_clear"):
+        update_search_vector(books)
+        update_author_names(books)
+        touch_books(books)
+
+
+@receiver(post_delete, sender=BookInstance)
+def instance_deleted(sender, instance: BookInstance, **kwargs):
+    touch_books(Book.objects.filter(pk=instance.book_id))
+    adjust_stats(
+        num_instances=-1,
+        num_instances_available=-(instance.status_id == AVAILABLE_STATUS),
+    )
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+def catalog_object_created(sender, instance, created, **kwargs):
+    if created:
+        adjust_stats(**{f"num_{sender._meta.model_name}s": 1})
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+def catalog_object_deleted(sender, instance, **kwargs):
+    adjust_stats(**{f"num_{sender._meta.model_name}s": -1})
+
+
+@receiver(post_save, sender=BookInstance)
+def instance_saved(sender, instance: BookInstance, created, **kwargs):
+    available = instance.status_id == AVAILABLE_STATUS
+    if created:
+        adjust_stats(num_instances=1, num_instances_available=int(available))
+    else:
+        loaded = getattr(instance, "_loaded_values", {})
+        old_status = loaded.get("status_id", instance.status_id)
+        was_available = old_status == AVAILABLE_STATUS
+        adjust_stats(num_instances_available=available - was_available)
+    instance._loaded_values = {"status_id": instance.status_id}
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Language)
+@receiver(post_save, sender=Publisher)
+def book_reference_renamed(sender, instance, created, **kwargs):
+    if not created:
+        touch_books(Book.objects.filter(**{sender._meta.model_name: instance}))
+
+
+@receiver(post_save, sender=Status)
+def status_renamed(sender, instance: Status, created, **kwargs):
+    if not created:
+        touch_books(Book.objects.filter(bookinstance__status=instance))
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=UserBookRelation)
+@receiver(post_delete, sender=UserBookRelation)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(m2m_changed, sender=Book.author.through)
+def catalog_changed(sender, **kwargs):
+    bump_version()
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, update_fields=None, **kwargs):
+    if update_fields is None or READER_FIELDS & set(update_fields):
+        bump_version()
+
+
+@receiver(post_save, sender=get_user_model())
+def reader_renamed(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is not None and not READER_FIELDS & set(update_fields):
+        return
+    touch_books(Book.objects.filter(owner=instance))
+    touch_books(Book.objects.filter(readers=instance))
+
+
+@receiver(pre_delete, sender=get_user_model())
+def owner_deleting(sender, instance, **kwargs):
+    instance._owned_book_ids = list(
+        Book.objects.filter(owner=instance).values_list("pk", flat=True)
+    )
+
+
+@receiver(post_delete, sender=get_user_model())
+def owner_deleted(sender, instance, **kwargs):
+    touch_books(Book.objects.filter(pk__in=instance._owned_book_ids))
+
+
+@receiver(pre_save, sender=Book)
+@receiver(pre_save, sender=Author)
+def photo_uploading(sender, instance, **kwargs):
+    instance._photo_uploaded = bool(instance.photo) and not instance.photo._committed
+    if instance._photo_uploaded:
+        instance.photo_status = PhotoStatus.PENDING
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+def photo_uploaded(sender, instance, **kwargs):
+    if getattr(instance, "_photo_uploaded", False):
+        enqueue_photo(instance)
+        instance._photo_uploaded = False
+
+
+@receiver(cleanup_pre_delete)
+def photo_replaced(sender, file, **kwargs):
+    if sender in (Book, Author):
+        delete_variants(file)
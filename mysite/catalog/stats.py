@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import F
+
+from .cache import can_store, get_cache, get_version
+from .models import Book, CatalogStats
+from .routers import uses_shared_cache
+
+AVAILABLE_STATUS = 2
+FEATURED_BOOKS = 6
+STATS_PK = 1
+STATS_FIELDS = ("num_books", "num_instances", "num_instances_available", "num_authors")
+
+
+# All the counts in one round trip, each a scalar subquery.
+COUNTS_SQL = """
+SELECT
+    (SELECT COUNT(*) FROM catalog_book),
+    (SELECT COUNT(*) FROM catalog_bookinstance),
+    (SELECT COUNT(*) FROM catalog_bookinstance WHERE status_id = %s),
+    (SELECT COUNT(*) FROM catalog_author)
+"""
+
+
+def catalog_counts() -> dict:
+    connection = connections[router.db_for_read(CatalogStats)]
+    with connection.cursor() as cursor:
+        cursor.execute(COUNTS_SQL, [AVAILABLE_STATUS])
+        return dict(zip(STATS_FIELDS, cursor.fetchone()))
+
+
+def reconcile_stats() -> dict:
+    counts = catalog_counts()
+    CatalogStats.objects.update_or_create(pk=STATS_PK, defaults=counts)
+    return counts
+
+
+def adjust_stats(**deltas: int) -> None:
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if changes and not CatalogStats.objects.filter(pk=STATS_PK).update(**changes):
+        reconcile_stats()
+
+
+def get_catalog_stats() -> dict:
+    stats = CatalogStats.objects.filter(pk=STATS_PK).values(*STATS_FIELDS).first()
+    return stats if stats is not None else reconcile_stats()
+
+
+def featured_books(limit: int = FEATURED_BOOKS) -> list[Book]:
+    # Served by book_featured_idx: reads at most `limit` index entries.
+    books = Book.objects.only("pk", "title", "price", "photo", "photo_status")
+    return list(books.order_by("-likes_count", "id")[:limit])
+
+
+def index_stats() -> dict:
+    """
+    Counts from the CatalogStats row and the featured books for the home
+    page, the latter cached under the current catalog version like the API
+    responses (see CachedResponseMixin).
+    """
+    if not uses_shared_cache():
+        return {**get_catalog_stats(), "books": featured_books()}
+    cache = get_cache()
+    key = f"catalog:featured:v{get_version()}"
+    books = cache.get(key)
+    if books is None:
+        books = featured_books()
+        if can_store():
+            cache.set(key, books, settings.CATALOG_CACHE_TIMEOUT)
+    return {**get_catalog_stats(), "books": books}
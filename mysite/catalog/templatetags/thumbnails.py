@@ -0,0 +1,17 @@
+from django import template
+
+from catalog.thumbnails import picture_html, variant_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail(photo, variant="thumb", fmt="webp"):
+    """{% thumbnail book.photo "card" %} -> URL of the card-sized WebP."""
+    return variant_url(photo, variant, fmt)
+
+
+@register.simple_tag
+def picture(photo, variant="thumb", alt="", css_class=""):
+    """<picture> with the WebP variant and a JPEG fallback."""
+    return picture_html(photo, variant, alt, css_class)
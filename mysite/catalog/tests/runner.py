@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class CatalogTestRunner(DiscoverRunner):
+    """
+    Reads every model from the default database unless a test case opts in
+    to the replicas with override_settings(CATALOG_REPLICA_READS=True): a
+    replica is a test mirror on a connection of its own and does not see the
+    uncommitted data of a TestCase.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._replica_reads = settings.CATALOG_REPLICA_READS
+        settings.CATALOG_REPLICA_READS = False
+
+    def teardown_test_environment(self, **kwargs):
+        settings.CATALOG_REPLICA_READS = self._replica_reads
+        super().teardown_test_environment(**kwargs)
@@ -1,13 +1,28 @@
+import asyncio
 import json
+import time
+from datetime import date, timedelta
 
-from django.db.models import Count, Case, When, Avg
-from rest_framework.test import APITestCase
+from asgiref.sync import sync_to_async
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework import status
 from django.urls import reverse
+from django.utils.http import http_date
 from django.contrib.auth import get_user_model
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.test import override_settings
 
-from catalog.models import Book, UserBookRelation
-from catalog.serializers import BookSerializer
+from catalog.models import Author, Book, BookInstance, Genre, UserBookRelation
+from catalog import async_views
+from catalog.views import BookViewSet
+from catalog.cache import get_cache
+from catalog.middleware import PRIMARY_COOKIE
+from catalog.pagination import KeysetPagination
+from catalog.serializers import READERS_PREVIEW, BookSerializer
 
 
 class BooksApiTestCase(APITestCase):
@@ -42,30 +57,24 @@ class BooksApiTestCase(APITestCase):
     def test_get(self):
         url = reverse("book-list")
         response = self.client.get(url)
-        books = Book.objects.annotate(
-            annotated_likes=Count(Case(When(userbookrelation__like=True, then=1))),
-        ).order_by("id")
+        books = Book.objects.order_by("id")
         serializer_data = BookSerializer(books, many=True).data
         self.assertEqual(status.HTTP_200_OK, response.status_code)
-        self.assertEqual(serializer_data, response.data)
-        self.assertEqual(serializer_data, response.data)
+        self.assertEqual(serializer_data, response.json()["results"])
+        self.assertEqual(serializer_data, response.json()["results"])
         self.assertEqual(serializer_data[0]["rating"], "5.00")
         # self.assertEqual(serializer_data[0]["likes_count"], 1)
         self.assertEqual(serializer_data[0]["annotated_likes"], 1)
 
     def test_get_search(self):
         url = reverse("book-list")
-        books = (
-            Book.objects.filter(pk__in=[self.book_1.pk, self.book_2.pk])
-            .annotate(
-                annotated_likes=Count(Case(When(userbookrelation__like=True, then=1))),
-            )
-            .order_by("id")
+        books = Book.objects.filter(pk__in=[self.book_1.pk, self.book_2.pk]).order_by(
+            "id"
         )
         response = self.client.get(url, data={"search": 159})
         serializer_data = BookSerializer(books, many=True).data
         self.assertEqual(status.HTTP_200_OK, response.status_code)
-        self.assertEqual(serializer_data, response.data)
+        self.assertEqual(serializer_data, response.json()["results"])
 
     def test_created(self):
         self.assertEqual(3, Book.objects.all().count())
@@ -211,3 +220,726 @@ class BooksRelationTestCase(APITestCase):
             url, data=json_data, content_type="application/json"
         )
         self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_counters(self):
+        url = reverse("userbookrelation-detail", kwargs={"book": self.book_1.pk})
+        self.client.force_login(self.user)
+        for data in ({"like": True, "rate": 4}, {"rate": 2}):
+            response = self.client.patch(
+                url, data=json.dumps(data), content_type="application/json"
+            )
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+        expected = {
+            "book": self.book_1.pk,
+            "like": True,
+            "in_bookmarks": False,
+            "rate": 2,
+        }
+        self.assertEqual(expected, response.data)
+        self.book_1.refresh_from_db()
+        self.assertEqual(
+            (1, 1, "2.00"),
+            (
+                self.book_1.readers_count,
+                self.book_1.likes_count,
+                str(self.book_1.rating),
+            ),
+        )
+
+    def test_missing_book(self):
+        url = reverse("userbookrelation-detail", kwargs={"book": self.book_2.pk + 1})
+        self.client.force_login(self.user)
+        response = self.client.patch(
+            url, data=json.dumps({"like": True}), content_type="application/json"
+        )
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+        self.assertFalse(UserBookRelation.objects.exists())
+
+
+class BooksPaginationTestCase(APITestCase):
+    def setUp(self) -> None:
+        for i, year in enumerate([2001, 2000, 2001, 1999, 2001, 2000, 2001]):
+            Book.objects.create(
+                title=f"Book_{i % 3}",
+                year=year,
+                summary=f"Summary book_{i}",
+                isbn=123456789,
+                price=100 + i,
+            )
+
+    def walk(self, params):
+        url = reverse("book-list")
+        ids = []
+        while url:
+            response = self.client.get(url, data=params)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            ids.extend(book["id"] for book in response.json()["results"])
+            url, params = response.json()["next"], None
+        return ids
+
+    def test_walk_default_ordering(self):
+        ids = self.walk({"page_size": 2})
+        self.assertEqual(list(Book.objects.order_by("id").values_list("id", flat=True)), ids)
+
+    def test_walk_ordering_with_duplicates(self):
+        for ordering in ["title", "-year", "year,-title"]:
+            expected = list(
+                Book.objects.order_by(*ordering.split(","), "pk").values_list(
+                    "id", flat=True
+                )
+            )
+            self.assertEqual(expected, self.walk({"page_size": 2, "ordering": ordering}))
+
+    def test_previous(self):
+        url = reverse("book-list")
+        first = self.client.get(url, data={"page_size": 3, "ordering": "-year"})
+        second = self.client.get(first.json()["next"])
+        back = self.client.get(second.json()["previous"])
+        self.assertEqual(first.json()["results"], back.json()["results"])
+        self.assertIsNone(first.json()["previous"])
+
+    def test_max_page_size(self):
+        request = Request(APIRequestFactory().get("/", {"page_size": 1000}))
+        paginator = KeysetPagination()
+        self.assertEqual(paginator.max_page_size, paginator.get_page_size(request))
+
+    def test_invalid_cursor(self):
+        url = reverse("book-list")
+        response = self.client.get(url, data={"cursor": "broken"})
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+
+class BooksSearchTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.author = Author.objects.create(
+            first_name="Борис", last_name="Акунин", about="Писатель"
+        )
+        self.book_1 = Book.objects.create(
+            title="Азазель",
+            year=1998,
+            summary="Первый роман о сыщике Эрасте Фандорине",
+            isbn=123456789,
+            price=350,
+        )
+        self.book_1.author.add(self.author)
+        self.book_2 = Book.objects.create(
+            title="Турецкий гамбит",
+            year=1998,
+            summary="Фандорин на войне",
+            isbn=987654321,
+            price=400,
+        )
+        self.book_3 = Book.objects.create(
+            title="Мастер и Маргарита",
+            year=1967,
+            summary="Роман",
+            isbn=555555555,
+            price=500,
+        )
+
+    def search(self, term):
+        response = self.client.get(reverse("book-list"), data={"search": term})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return [book["id"] for book in response.json()["results"]]
+
+    def test_title_summary_author(self):
+        self.assertEqual([self.book_3.pk], self.search("маргарита"))
+        self.assertEqual([self.book_1.pk, self.book_2.pk], self.search("Фандорина"))
+        self.assertEqual([self.book_1.pk], self.search("Акунин"))
+
+    def test_pages(self):
+        url = reverse("book-list")
+        params, ids = {"search": "Фандорина", "page_size": 1}, []
+        while url:
+            response = self.client.get(url, data=params)
+            ids.extend(book["id"] for book in response.json()["results"])
+            url, params = response.json()["next"], None
+        self.assertEqual(self.search("Фандорина"), ids)
+
+    def test_typo(self):
+        self.assertEqual([self.book_2.pk], self.search("Турецкй гамбит"))
+
+    def test_price(self):
+        self.assertEqual([self.book_2.pk], self.search("400"))
+        self.assertEqual([self.book_2.pk], self.search("400.00"))
+        for term in ("1e999999", "123456789", "400.001", "NaN", "Infinity"):
+            with self.subTest(term):
+                self.assertEqual([], self.search(term))
+
+    def test_author_changes(self):
+        self.author.last_name = "Чхартишвили"
+        self.author.save()
+        self.assertEqual([self.book_1.pk], self.search("Чхартишвили"))
+        self.book_2.author.add(self.author)
+        self.assertEqual([self.book_1.pk, self.book_2.pk], self.search("Чхартишвили"))
+        self.author.delete()
+        self.assertEqual([], self.search("Чхартишвили"))
+
+
+class BooksCacheTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create(
+            username="test_user", first_name="Test", last_name="User"
+        )
+        self.book_1 = Book.objects.create(
+            title="Book_1",
+            year=2000,
+            summary="Summary book_1",
+            isbn=123456789,
+            price=159,
+            owner=self.user,
+        )
+
+    def test_hit_and_invalidate(self):
+        url = reverse("book-detail", kwargs={"pk": self.book_1.pk})
+        response = self.client.get(url)
+        self.assertEqual("MISS", response["X-Cache"])
+        response = self.client.get(url)
+        self.assertEqual("HIT", response["X-Cache"])
+        self.assertEqual(0, response.json()["annotated_likes"])
+
+        UserBookRelation.objects.create(user=self.user, book=self.book_1, like=True)
+        response = self.client.get(url)
+        self.assertEqual("MISS", response["X-Cache"])
+        self.assertEqual(1, response.json()["annotated_likes"])
+        self.assertEqual("Test", response.json()["readers"][0]["first_name"])
+
+        self.user.first_name = "Renamed"
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual("Renamed", response.json()["readers"][0]["first_name"])
+
+        self.user.last_login = None
+        self.user.save(update_fields=["last_login"])
+        response = self.client.get(url)
+        self.assertEqual("HIT", response["X-Cache"])
+
+    def test_query_params_in_key(self):
+        url = reverse("book-list")
+        self.client.get(url, data={"ordering": "title"})
+        response = self.client.get(url, data={"ordering": "-title"})
+        self.assertEqual("MISS", response["X-Cache"])
+
+    def test_stats(self):
+        url = reverse("book-cache-stats")
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+
+        self.user.is_staff = True
+        self.user.save()
+        before = self.client.get(url).json()
+        self.client.get(reverse("book-list"))
+        self.client.get(reverse("book-list"))
+        after = self.client.get(url).json()
+        self.assertEqual(before["hits"] + 1, after["hits"])
+        self.assertEqual(before["misses"] + 1, after["misses"])
+
+    def test_db_stats(self):
+        url = reverse("book-db-stats")
+        self.client.force_login(self.user)
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.client.get(url).status_code)
+
+        self.user.is_staff = True
+        self.user.save()
+        stats = self.client.get(url).json()["default"]
+        self.assertEqual("postgresql", stats["vendor"])
+        self.assertGreaterEqual(stats["opened"], 1)
+
+
+class BooksConditionalGetTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create(username="test_user")
+        self.book_1 = Book.objects.create(
+            title="Book_1",
+            year=2000,
+            summary="Summary book_1",
+            isbn=123456789,
+            price=159,
+        )
+
+    def test_detail(self):
+        url = reverse("book-detail", kwargs={"pk": self.book_1.pk})
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+        self.assertEqual(etag, response["ETag"])
+
+        UserBookRelation.objects.create(user=self.user, book=self.book_1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotEqual(etag, response["ETag"])
+
+    def test_detail_if_modified_since(self):
+        url = reverse("book-detail", kwargs={"pk": self.book_1.pk})
+        last_modified = self.client.get(url)["Last-Modified"]
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+    def test_list(self):
+        url = reverse("book-list")
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+        self.book_1.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([], response.json()["results"])
+
+    def test_list_if_modified_since(self):
+        url = reverse("book-list")
+        response = self.client.get(url)
+        self.assertNotIn("Last-Modified", response)
+
+        since = http_date(time.time() + 60)
+        self.book_1.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([], response.json()["results"])
+
+
+class BooksRelationBulkTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.staff = get_user_model().objects.create(username="staff", is_staff=True)
+        self.user = get_user_model().objects.create(username="test_user")
+        self.book_1 = Book.objects.create(
+            title="Book_1", year=2000, isbn=123456789, price=159
+        )
+        self.book_2 = Book.objects.create(
+            title="Book_2", year=2001, isbn=123456789, price=159
+        )
+        UserBookRelation.objects.create(user=self.user, book=self.book_1, rate=1)
+        self.url = reverse("userbookrelation-bulk")
+
+    def test_bulk(self):
+        data = [
+            {"user": self.user.pk, "book": self.book_1.pk, "rate": 5, "like": True},
+            {"user": self.staff.pk, "book": self.book_1.pk, "rate": 4},
+            {"user": self.staff.pk, "book": self.book_2.pk, "like": True},
+            {"user": self.staff.pk, "book": self.book_2.pk, "in_bookmarks": True},
+        ]
+        self.client.force_login(self.staff)
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(4, response.json()["rows"])
+        self.assertEqual(2, response.json()["books"])
+        self.assertIn("rows_per_second", response.json())
+
+        self.book_1.refresh_from_db()
+        self.book_2.refresh_from_db()
+        self.assertEqual("4.50", str(self.book_1.rating))
+        self.assertEqual(1, self.book_1.likes_count)
+        self.assertEqual(1, self.book_2.likes_count)
+        self.assertEqual(3, UserBookRelation.objects.count())
+        relation = UserBookRelation.objects.get(user=self.staff, book=self.book_2)
+        self.assertTrue(relation.in_bookmarks)
+        self.assertTrue(relation.like)
+
+    def test_partial_rows_merged(self):
+        data = [
+            {"user": self.user.pk, "book": self.book_2.pk, "like": True},
+            {"user": self.user.pk, "book": self.book_2.pk, "rate": 5},
+            {"user": self.user.pk, "book": self.book_2.pk, "like": False, "rate": 3},
+            {"user": self.user.pk, "book": self.book_2.pk, "in_bookmarks": True},
+        ]
+        self.client.force_login(self.staff)
+        response = self.client.post(self.url, data[:2], format="json")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        relation = UserBookRelation.objects.get(user=self.user, book=self.book_2)
+        self.assertTrue(relation.like)
+        self.assertEqual(5, relation.rate)
+        self.book_2.refresh_from_db()
+        self.assertEqual(1, self.book_2.likes_count)
+
+        self.client.post(self.url, data[2:], format="json")
+        relation.refresh_from_db()
+        self.assertFalse(relation.like)
+        self.assertEqual(3, relation.rate)
+        self.assertTrue(relation.in_bookmarks)
+
+    def test_unknown_book(self):
+        self.client.force_login(self.staff)
+        data = [{"user": self.user.pk, "book": 0, "rate": 5}]
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_not_staff(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, [], format="json")
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+
+
+class BooksExportTestCase(APITestCase):
+    def setUp(self) -> None:
+        genre = Genre.objects.create(name="Роман")
+        for i in range(5):
+            book = Book.objects.create(
+                title=f"Book_{i}", year=2000, isbn=123456789, price=100, genre=genre
+            )
+            book.author.add(
+                Author.objects.create(first_name="Test", last_name=f"Author_{i}")
+            )
+        self.url = reverse("book-export")
+
+    def read(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        # one server-side cursor plus one author prefetch per chunk
+        with mock.patch.object(BookViewSet, "export_chunk_size", 2):
+            with self.assertNumQueries(4):
+                lines = self.read(self.client.get(self.url)).splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(5, len(rows))
+        self.assertEqual("Роман", rows[0]["genre"])
+        self.assertEqual(
+            [{"first_name": "Test", "last_name": "Author_0"}], rows[0]["authors"]
+        )
+
+    def test_json(self):
+        response = self.client.get(self.url, data={"output": "json"})
+        self.assertEqual("application/json", response["Content-Type"])
+        rows = json.loads(self.read(response))
+        self.assertEqual(
+            [f"Book_{i}" for i in range(5)], [row["title"] for row in rows]
+        )
+
+    def test_empty_and_invalid(self):
+        Book.objects.all().delete()
+        response = self.client.get(self.url, data={"output": "json"})
+        self.assertEqual([], json.loads(self.read(response)))
+        response = self.client.get(self.url, data={"output": "xml"})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+
+class BooksReadersTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.book_1 = Book.objects.create(
+            title="Book_1", year=2000, isbn=123456789, price=159
+        )
+        self.book_2 = Book.objects.create(
+            title="Book_2", year=2001, isbn=123456789, price=159
+        )
+        for i in range(7):
+            user = get_user_model().objects.create(
+                username=f"user_{i}", first_name=f"Name_{i}", last_name="User"
+            )
+            UserBookRelation.objects.create(user=user, book=self.book_1)
+            if i % 2:
+                UserBookRelation.objects.create(user=user, book=self.book_2)
+
+    def test_count_and_preview(self):
+        url = reverse("book-list")
+        with self.assertNumQueries(3):
+            response = self.client.get(url, data={"readers_preview": 2})
+        book_1, book_2 = response.json()["results"]
+        self.assertEqual((7, 3), (book_1["readers_count"], book_2["readers_count"]))
+        self.assertEqual(
+            ["Name_0", "Name_1"], [reader["first_name"] for reader in book_1["readers"]]
+        )
+        self.assertEqual(2, len(book_2["readers"]))
+
+        response = self.client.get(url, data={"readers_preview": 0})
+        self.assertEqual([], response.json()["results"][0]["readers"])
+        response = self.client.get(url)
+        self.assertEqual(READERS_PREVIEW, len(response.json()["results"][0]["readers"]))
+
+        UserBookRelation.objects.filter(book=self.book_2).first().delete()
+        self.book_2.refresh_from_db()
+        self.assertEqual(2, self.book_2.readers_count)
+
+    def test_readers(self):
+        url = reverse("book-readers", kwargs={"pk": self.book_1.pk})
+        names, params = [], {"page_size": 3}
+        while url:
+            response = self.client.get(url, data=params)
+            names.extend(reader["first_name"] for reader in response.json()["results"])
+            url, params = response.json()["next"], None
+        self.assertEqual([f"Name_{i}" for i in range(7)], names)
+
+        response = self.client.get(reverse("book-readers", kwargs={"pk": 0}))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+
+class BooksPayloadTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create(
+            username="test_user", first_name="Test", last_name="User"
+        )
+        self.book_1 = Book.objects.create(
+            title="Book_1", year=2000, isbn=123456789, price=159, owner=self.user
+        )
+        self.book_2 = Book.objects.create(
+            title="Book_2", year=2001, isbn=123456789, price=159
+        )
+        UserBookRelation.objects.create(user=self.user, book=self.book_1, rate=4)
+        self.url = reverse("book-list")
+
+    def get(self, url):
+        get_cache().clear()
+        return self.client.get(url).json()
+
+    def test_payloads(self):
+        data = self.get(self.url)
+        books = Book.objects.order_by("id")
+        self.assertEqual(BookSerializer(books, many=True).data, data["results"])
+        self.assertTrue(all(book.payload_json for book in books))
+
+        with self.assertNumQueries(2):
+            self.assertEqual(data, self.get(self.url))
+
+        relation = UserBookRelation.objects.get(user=self.user)
+        relation.like = True
+        relation.save()
+        self.assertIsNone(Book.objects.get(pk=self.book_1.pk).payload_json)
+        data = self.get(self.url)
+        self.assertEqual(1, data["results"][0]["annotated_likes"])
+
+        self.user.username = "renamed"
+        self.user.save()
+        detail = self.get(reverse("book-detail", kwargs={"pk": self.book_1.pk}))
+        self.assertEqual("renamed", detail["owner_name"])
+        self.assertEqual(
+            BookSerializer(Book.objects.get(pk=self.book_1.pk)).data, detail
+        )
+
+    def test_owner_deleted(self):
+        owner = get_user_model().objects.create(username="owner")
+        Book.objects.filter(pk=self.book_2.pk).update(owner=owner)
+        url = reverse("book-detail", kwargs={"pk": self.book_2.pk})
+        response = self.client.get(url)
+        self.assertEqual("owner", response.json()["owner_name"])
+
+        owner.delete()
+        self.assertIsNone(Book.objects.get(pk=self.book_2.pk).payload_json)
+        detail = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(status.HTTP_200_OK, detail.status_code)
+        self.assertEqual("", detail.json()["owner_name"])
+
+
+@override_settings(ROOT_URLCONF="mysite.asgi_urls")
+class BooksAsyncReadTestCase(APITestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = get_user_model().objects.create(
+            username="test_user", first_name="Test", last_name="User"
+        )
+        self.books = [
+            Book.objects.create(
+                title=f"Book_{i}", year=2000 + i, isbn=i, price=100 + i, owner=self.user
+            )
+            for i in range(5)
+        ]
+        UserBookRelation.objects.create(user=self.user, book=self.books[0], rate=4)
+
+    def sync_get(self, url, **params):
+        get_cache().clear()
+        with override_settings(ROOT_URLCONF="mysite.urls"):
+            return self.client.get(url, params)
+
+    async def test_list(self):
+        url, params = "/book/", {"page_size": 2}
+        while url:
+            expected = await sync_to_async(self.sync_get)(url, **(params or {}))
+            response = await self.async_client.get(url, params)
+            self.assertEqual(200, response.status_code)
+            self.assertNotIn("X-Cache", response)
+            self.assertEqual(expected.json(), response.json())
+            self.assertEqual(expected["ETag"], response["ETag"])
+            url, params = response.json()["next"], None
+
+        response = await self.async_client.get(
+            "/book/", headers={"if-none-match": expected["ETag"]}
+        )
+        self.assertEqual(200, response.status_code)
+        etag = response["ETag"]
+        response = await self.async_client.get(
+            "/book/", headers={"if-none-match": etag}
+        )
+        self.assertEqual(304, response.status_code)
+
+    async def test_detail(self):
+        url = f"/book/{self.books[0].pk}/"
+        expected = await sync_to_async(self.sync_get)(url)
+        response = await self.async_client.get(url)
+        self.assertEqual(expected.json(), response.json())
+        response = await self.async_client.get(
+            url, headers={"if-none-match": expected["ETag"]}
+        )
+        self.assertEqual(304, response.status_code)
+
+        response = await self.async_client.get("/book/0/")
+        self.assertEqual(404, response.status_code)
+
+    async def test_readers(self):
+        url = f"/book/{self.books[0].pk}/readers/"
+        expected = await sync_to_async(self.sync_get)(url)
+        response = await self.async_client.get(url)
+        self.assertEqual(expected.json(), response.json())
+
+    async def test_delegated(self):
+        # Filters, search and a non-default preview fall back to the DRF views.
+        for params in ({"search": "Book_3"}, {"readers_preview": 1}, {"cursor": "x"}):
+            expected = await sync_to_async(self.sync_get)("/book/", **params)
+            response = await self.async_client.get("/book/", params)
+            self.assertEqual(expected.status_code, response.status_code)
+            self.assertEqual(expected.json(), response.json())
+
+        url = f"/book/{self.books[0].pk}/"
+        response = await self.async_client.patch(
+            url, {"title": "New"}, content_type="application/json"
+        )
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+
+    def test_views_are_async(self):
+        for view in (
+            async_views.book_list,
+            async_views.book_detail,
+            async_views.book_readers,
+        ):
+            self.assertTrue(asyncio.iscoroutinefunction(view))
+
+
+class OverdueLoansTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.staff = get_user_model().objects.create(username="staff", is_staff=True)
+        self.reader = get_user_model().objects.create(username="reader")
+        self.books = [
+            Book.objects.create(title=f"Book_{i}", year=2000, isbn=i, price=100)
+            for i in range(2)
+        ]
+        past = date.today() - timedelta(days=10)
+        for borrower, book, due_back in (
+            (self.staff, self.books[0], past),
+            (self.staff, self.books[0], past + timedelta(days=5)),
+            (self.staff, self.books[1], past),
+            (self.reader, self.books[1], past),
+            (self.reader, self.books[0], date.today()),
+            (None, self.books[0], past),
+        ):
+            BookInstance.objects.create(
+                book=book, inv_num="1", borrower=borrower, due_back=due_back
+            )
+
+    def test_overdue_loans(self):
+        self.client.force_login(self.staff)
+        url = reverse("overdue-loan-list") + "?page_size=2"
+        results = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            results += response.data["results"]
+            url = response.data["next"]
+        self.assertEqual(
+            [
+                ("staff", "Book_0", 2, date.today() - timedelta(days=10)),
+                ("staff", "Book_1", 1, date.today() - timedelta(days=10)),
+                ("reader", "Book_1", 1, date.today() - timedelta(days=10)),
+            ],
+            [
+                (
+                    loan["username"],
+                    loan["title"],
+                    loan["instances"],
+                    date.fromisoformat(loan["first_due_back"]),
+                )
+                for loan in results
+            ],
+        )
+
+    def test_staff_only(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse("overdue-loan-list"))
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+
+
+@skipUnless(settings.CATALOG_DB_REPLICAS, "DJANGO_DB_REPLICAS is not set")
+@override_settings(CATALOG_REPLICA_READS=True)
+class BooksReplicaTestCase(APITestCase):
+    # Runs with DJANGO_DB_REPLICAS set, e.g. DJANGO_DB_REPLICAS=localhost
+    # manage.py test catalog. The replica is a test mirror on its own
+    # connection, so it does not see the uncommitted data of the test, like
+    # a replica lagging behind.
+    databases = {"default", *settings.CATALOG_DB_REPLICAS}
+
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = get_user_model().objects.create(username="test_user")
+        self.book = Book.objects.create(
+            title="Book_1", year=2000, isbn=1, price=100, owner=self.user
+        )
+        self.url = f"/book/{self.book.pk}/"
+
+    def test_read_your_writes(self):
+        self.client.force_login(self.user)
+        self.assertEqual(404, self.client.get(self.url).status_code)
+
+        response = self.client.patch(
+            reverse("userbookrelation-detail", kwargs={"book": self.book.pk}),
+            data=json.dumps({"like": True}),
+            content_type="application/json",
+        )
+        self.assertEqual(200, response.status_code)
+        cookie = response.cookies[PRIMARY_COOKIE]
+        self.assertEqual(settings.CATALOG_REPLICA_PIN_SECONDS, cookie["max-age"])
+
+        response = self.client.get(self.url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, response.json()["annotated_likes"])
+
+        # The pinned client read the primary, so the other clients get its
+        # response rather than the lagging replica.
+        del self.client.cookies[PRIMARY_COOKIE]
+        response = self.client.get(self.url)
+        self.assertEqual("HIT", response["X-Cache"])
+        self.assertEqual(1, response.json()["annotated_likes"])
+
+    def test_other_client_between_write_and_read(self):
+        self.client.force_login(self.user)
+        self.assertEqual([], self.client.get("/book/").json()["results"])
+        response = self.client.patch(
+            reverse("userbookrelation-detail", kwargs={"book": self.book.pk}),
+            data=json.dumps({"like": True}),
+            content_type="application/json",
+        )
+        self.assertEqual(200, response.status_code)
+
+        # Another client reads the lagging replica right after the write;
+        # the stale response is not cached under the new version.
+        other = self.client_class()
+        response = other.get("/book/")
+        self.assertEqual([], response.json()["results"])
+        self.assertEqual("MISS", other.get("/book/")["X-Cache"])
+
+        response = self.client.get("/book/")
+        self.assertEqual("MISS", response["X-Cache"])
+        self.assertEqual(
+            [1], [book["annotated_likes"] for book in response.json()["results"]]
+        )
+        response = other.get("/book/")
+        self.assertEqual("HIT", response["X-Cache"])
+        self.assertEqual(
+            [1], [book["annotated_likes"] for book in response.json()["results"]]
+        )
+
+
+@override_settings(CATALOG_TIMING_SAMPLE_RATE=1)
+class BooksTimingTestCase(APITestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        Book.objects.create(title="Book_1", year=2000, isbn=1, price=100)
+
+    def test_serialize_span(self):
+        with self.assertLogs("catalog.timing") as logs:
+            response = self.client.get("/book/")
+        self.assertIn("serialize;dur=", response["Server-Timing"])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual("book-list", record["url_name"])
+        self.assertIn("serialize_ms", record)
+        self.assertNotIn("template_ms", record)
@@ -1,8 +1,54 @@
-from django.test import TestCase
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.db.models import Count, Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import ExifTags, Image
+import psycopg2
+from psycopg2 import OperationalError
 from django.contrib.auth import get_user_model
 
-from catalog.loginc import set_rating
-from catalog.models import Book, UserBookRelation
+from catalog.backends.pooled import base as pooled_base
+from catalog.backends.pooled.base import ConnectionPool, DatabaseWrapper
+from catalog.cache import bump_version, can_store, get_version
+from catalog.loginc import rebuild_book_counters, save_relation, set_rating
+from catalog.management.commands.benchmark_catalog import SCENARIOS
+from catalog.models import (
+    Author,
+    Book,
+    BookInstance,
+    CatalogStats,
+    Genre,
+    Status,
+    UserBookRelation,
+)
+from catalog.photos import process_photos
+from catalog.routers import (
+    ReplicaRouter,
+    end_request,
+    reads_primary,
+    start_request,
+    uses_shared_cache,
+)
+from catalog.stats import AVAILABLE_STATUS, get_catalog_stats
+from catalog.thumbnails import (
+    VARIANTS,
+    PhotoStatus,
+    delete_variants,
+    render_photo,
+    variant_name,
+    variant_names,
+)
 
 
 class SetRatingTestCase(TestCase):
@@ -27,7 +73,693 @@ class SetRatingTestCase(TestCase):
         UserBookRelation.objects.create(user=user2, book=self.book_1, like=True, rate=1)
         UserBookRelation.objects.create(user=user3, book=self.book_1, like=True, rate=5)
 
+    def test_incremental(self):
+        self.book_1.refresh_from_db()
+        self.assertEqual("3.33", str(self.book_1.rating))
+
     def test_ok(self): 
         set_rating(self.book_1)
         self.book_1.refresh_from_db()
-        self.assertEqual("3.33", str(self.book_1.rating))
\ No newline at end of file
+        self.assertEqual("3.33", str(self.book_1.rating))
+
+
+class LikesCountTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user1 = get_user_model().objects.create(username="test_user")
+        self.user2 = get_user_model().objects.create(username="test_user2")
+        self.book_1 = Book.objects.create(
+            title="Book_1",
+            year=2000,
+            summary="Summary book_1",
+            isbn=123456789,
+            price=100.50,
+        )
+
+    def test_like_changes(self):
+        relation = UserBookRelation.objects.create(
+            user=self.user1, book=self.book_1, like=True
+        )
+        UserBookRelation.objects.create(user=self.user2, book=self.book_1, like=True)
+        self.book_1.refresh_from_db()
+        self.assertEqual(2, self.book_1.likes_count)
+
+        relation = UserBookRelation.objects.get(pk=relation.pk)
+        relation.like = False
+        relation.save()
+        relation.save()
+        self.book_1.refresh_from_db()
+        self.assertEqual(1, self.book_1.likes_count)
+
+        UserBookRelation.objects.filter(user=self.user2).delete()
+        self.book_1.refresh_from_db()
+        self.assertEqual(0, self.book_1.likes_count)
+
+    def test_rebuild(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book_1, like=True)
+        Book.objects.update(likes_count=10, readers_count=10)
+        call_command("rebuild_book_counters", stdout=StringIO())
+        self.book_1.refresh_from_db()
+        self.assertEqual(1, self.book_1.likes_count)
+        self.assertEqual(1, self.book_1.readers_count)
+
+
+class UpdateRatingTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user1 = get_user_model().objects.create(username="test_user")
+        self.user2 = get_user_model().objects.create(username="test_user2")
+        self.book_1 = Book.objects.create(
+            title="Book_1",
+            year=2000,
+            summary="Summary book_1",
+            isbn=123456789,
+            price=100.50,
+        )
+
+    def test_rate_changes(self):
+        relation = UserBookRelation.objects.create(
+            user=self.user1, book=self.book_1, rate=4
+        )
+        UserBookRelation.objects.create(user=self.user2, book=self.book_1, rate=1)
+        self.book_1.refresh_from_db()
+        self.assertEqual("2.50", str(self.book_1.rating))
+        self.assertEqual((5, 2), (self.book_1.rating_sum, self.book_1.rating_count))
+
+        relation = UserBookRelation.objects.get(pk=relation.pk)
+        relation.rate = 5
+        relation.save()
+        self.book_1.refresh_from_db()
+        self.assertEqual("3.00", str(self.book_1.rating))
+
+        relation.rate = None
+        relation.save()
+        self.book_1.refresh_from_db()
+        self.assertEqual("1.00", str(self.book_1.rating))
+        self.assertEqual((1, 1), (self.book_1.rating_sum, self.book_1.rating_count))
+
+        UserBookRelation.objects.filter(user=self.user2).delete()
+        self.book_1.refresh_from_db()
+        self.assertIsNone(self.book_1.rating)
+        self.assertEqual((0, 0), (self.book_1.rating_sum, self.book_1.rating_count))
+
+    def test_rebuild(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book_1, rate=4)
+        UserBookRelation.objects.create(user=self.user2, book=self.book_1, rate=3)
+        Book.objects.update(rating=None, rating_sum=0, rating_count=0)
+        call_command("rebuild_book_counters", stdout=StringIO())
+        self.book_1.refresh_from_db()
+        self.assertEqual("3.50", str(self.book_1.rating))
+        self.assertEqual((7, 2), (self.book_1.rating_sum, self.book_1.rating_count))
+
+
+class SaveRelationTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user1 = get_user_model().objects.create(username="test_user")
+        self.user2 = get_user_model().objects.create(username="test_user2")
+        self.book_1 = Book.objects.create(title="Book_1", year=2000, isbn=1, price=1)
+
+    def counters(self) -> tuple:
+        self.book_1.refresh_from_db()
+        return (
+            self.book_1.readers_count,
+            self.book_1.likes_count,
+            self.book_1.rating_sum,
+            self.book_1.rating_count,
+            str(self.book_1.rating),
+        )
+
+    def test_counters(self):
+        with self.assertNumQueries(2):
+            relation = save_relation(self.user1.pk, self.book_1.pk, {"like": True})
+        self.assertTrue(relation.like)
+        self.assertEqual((1, 1, 0, 0, "None"), self.counters())
+
+        with self.assertNumQueries(2):
+            relation = save_relation(self.user1.pk, self.book_1.pk, {"rate": 4})
+        self.assertEqual((True, 4), (relation.like, relation.rate))
+        save_relation(self.user2.pk, self.book_1.pk, {"like": True, "rate": 1})
+        self.assertEqual((2, 2, 5, 2, "2.50"), self.counters())
+
+        save_relation(self.user1.pk, self.book_1.pk, {"like": False, "rate": None})
+        self.assertEqual((2, 1, 1, 1, "1.00"), self.counters())
+
+        with self.assertNumQueries(2):
+            save_relation(self.user2.pk, self.book_1.pk, {"in_bookmarks": True})
+        with self.assertNumQueries(1):
+            save_relation(self.user2.pk, self.book_1.pk, {"in_bookmarks": True})
+
+        expected = self.counters()
+        rebuild_book_counters()
+        self.assertEqual(expected, self.counters())
+        relation = UserBookRelation.objects.get(user=self.user2, book=self.book_1)
+        self.assertEqual(
+            (True, True, 1), (relation.like, relation.in_bookmarks, relation.rate)
+        )
+
+    def test_missing_book(self):
+        self.assertIsNone(save_relation(self.user1.pk, self.book_1.pk + 1, {}))
+        self.assertFalse(UserBookRelation.objects.exists())
+
+
+class SaveRelationConcurrencyTestCase(TransactionTestCase):
+    def test_same_user(self):
+        user = get_user_model().objects.create(username="test_user")
+        book = Book.objects.create(title="Book_1", year=2000, isbn=1, price=1)
+
+        def write(number: int) -> None:
+            try:
+                values = {"like": number % 2 == 0, "rate": number % 5 + 1}
+                save_relation(user.pk, book.pk, values)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(write, range(40)))
+
+        book.refresh_from_db()
+        counters = (book.readers_count, book.likes_count, book.rating_sum)
+        rebuild_book_counters()
+        book.refresh_from_db()
+        self.assertEqual(
+            (book.readers_count, book.likes_count, book.rating_sum), counters
+        )
+        self.assertEqual(1, book.readers_count)
+
+
+class OverdueTestCase(TestCase):
+    def test_overdue(self):
+        user = get_user_model().objects.create(username="test_user")
+        book = Book.objects.create(title="Book_1", year=2000, isbn=1, price=1)
+        today = date.today()
+        for borrower, due_back in (
+            (user, today - timedelta(days=1)),
+            (user, today),
+            (user, None),
+            (None, today - timedelta(days=1)),
+        ):
+            BookInstance.objects.create(
+                book=book, inv_num="1", borrower=borrower, due_back=due_back
+            )
+        overdue = BookInstance.objects.overdue()
+        instances = BookInstance.objects.all()
+        self.assertEqual([i for i in instances if i.is_overdue], list(overdue))
+        self.assertEqual(1, len(overdue))
+        loan = {
+            "borrower": user.pk,
+            "book": book.pk,
+            "instances": 1,
+            "first_due_back": today - timedelta(days=1),
+        }
+        self.assertEqual([loan], list(BookInstance.objects.overdue_loans()))
+        self.assertFalse(BookInstance.objects.overdue(today - timedelta(days=1)))
+
+
+class ImportRelationsTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create(username="test_user")
+        self.book = Book.objects.create(title="Book_1", year=2000, isbn=1, price=1)
+
+    def import_rows(self, *rows: str) -> str:
+        with NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write("user,book,like,in_bookmarks,rate\n")
+            file.write("".join(f"{row}\n" for row in rows))
+            file.flush()
+            out = StringIO()
+            call_command("import_relations", file.name, stdout=out)
+        return out.getvalue()
+
+    def test_import(self):
+        out = self.import_rows(f"{self.user.pk},{self.book.pk},1,,3")
+        self.assertIn("Загружено строк: 1", out)
+        self.book.refresh_from_db()
+        self.assertEqual((1, "3.00"), (self.book.likes_count, str(self.book.rating)))
+
+    def test_invalid_rows(self):
+        for row in (
+            f"{self.user.pk},{self.book.pk},1,,0",
+            f"{self.user.pk},{self.book.pk},1,,9",
+            f"{self.user.pk},{self.book.pk},1,,12",
+            f"{self.user.pk},{self.book.pk},maybe,,",
+            f"{self.user.pk},{self.book.pk + 1},1,,",
+            f",{self.book.pk},1,,",
+        ):
+            with self.subTest(row), self.assertRaises(CommandError):
+                self.import_rows(f"{self.user.pk},{self.book.pk},,,", row)
+        self.assertFalse(UserBookRelation.objects.exists())
+
+
+class CatalogStatsTestCase(TestCase):
+    def setUp(self) -> None:
+        self.available = Status.objects.create(pk=AVAILABLE_STATUS, name="На складе")
+        self.issued = Status.objects.create(pk=AVAILABLE_STATUS + 1, name="Выдан")
+        self.author = Author.objects.create(
+            first_name="Test", last_name="Author", about="About"
+        )
+        self.book = Book.objects.create(
+            title="Book_1",
+            year=2000,
+            summary="Summary book_1",
+            isbn=123456789,
+            price=159,
+        )
+
+    def assertStats(self, books, instances, available, authors):
+        with self.assertNumQueries(1):
+            stats = get_catalog_stats()
+        expected = {
+            "num_books": books,
+            "num_instances": instances,
+            "num_instances_available": available,
+            "num_authors": authors,
+        }
+        self.assertEqual(expected, stats)
+
+    def test_signals(self):
+        self.assertStats(1, 0, 0, 1)
+
+        instance = BookInstance.objects.create(
+            book=self.book, inv_num="1", status=self.available
+        )
+        BookInstance.objects.create(book=self.book, inv_num="2", status=self.issued)
+        self.assertStats(1, 2, 1, 1)
+
+        instance.status = self.issued
+        instance.save()
+        self.assertStats(1, 2, 0, 1)
+        instance = BookInstance.objects.get(pk=instance.pk)
+        instance.status = self.available
+        instance.save()
+        instance.save()
+        self.assertStats(1, 2, 1, 1)
+
+        instance.delete()
+        self.assertStats(1, 1, 0, 1)
+        self.book.delete()
+        self.author.delete()
+        self.assertStats(0, 0, 0, 0)
+
+    def test_reconcile(self):
+        BookInstance.objects.create(book=self.book, inv_num="1", status=self.issued)
+        BookInstance.objects.update(status=self.available)
+        self.assertStats(1, 1, 0, 1)
+
+        call_command("reconcile_catalog_stats", stdout=StringIO())
+        self.assertStats(1, 1, 1, 1)
+
+    def test_missing_row(self):
+        CatalogStats.objects.all().delete()
+        Book.objects.create(title="Book_2", year=2000, summary="", isbn=1, price=1)
+        self.assertStats(2, 0, 0, 1)
+
+
+def make_image(size=(800, 1200), mode="RGBA", fmt="PNG", exif=None) -> bytes:
+    buffer = BytesIO()
+    image = Image.new(mode, size, "red")
+    if exif is None:
+        image.save(buffer, fmt)
+    else:
+        image.save(buffer, fmt, exif=exif)
+    return buffer.getvalue()
+
+
+class ThumbnailsTestCase(TestCase):
+    def setUp(self) -> None:
+        media = TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name, CATALOG_IMAGE_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create_book(self, photo):
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(
+                title="Book_1", year=2000, summary="", isbn=1, price=1, photo=photo
+            )
+        book.refresh_from_db()
+        return book
+
+    def test_upload(self):
+        book = self.create_book(SimpleUploadedFile("cover.png", make_image()))
+        self.assertEqual(PhotoStatus.READY, book.photo_status)
+        for name in variant_names(book.photo.name):
+            self.assertTrue(default_storage.exists(name), name)
+        for variant, (width, height) in VARIANTS.items():
+            name = variant_name(book.photo.name, variant, "jpeg")
+            with Image.open(default_storage.path(name)) as image:
+                self.assertEqual("JPEG", image.format)
+                self.assertEqual((round(width * 2 / 3), height), image.size)
+
+        self.assertEqual(
+            default_storage.url(variant_name(book.photo.name, "thumb", "webp")),
+            book.photo_thumb,
+        )
+
+    def test_replace(self):
+        book = self.create_book(SimpleUploadedFile("cover.png", make_image()))
+        old_names = variant_names(book.photo.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            book.photo = SimpleUploadedFile("new.png", make_image())
+            book.save()
+        for name in old_names:
+            self.assertFalse(default_storage.exists(name), name)
+        for name in variant_names(book.photo.name):
+            self.assertTrue(default_storage.exists(name), name)
+
+    def test_lazy(self):
+        name = default_storage.save("images/old.jpg", BytesIO(make_image(mode="RGB")))
+        book = self.create_book(name)
+        self.assertFalse(default_storage.exists(variant_name(name, "card", "webp")))
+
+        self.assertEqual(
+            default_storage.url(variant_name(name, "card", "webp")), book.photo_card
+        )
+        self.assertTrue(default_storage.exists(variant_name(name, "detail", "jpeg")))
+        self.assertEqual(
+            PhotoStatus.READY, Book.objects.get(pk=book.pk).photo_status
+        )
+
+    def test_same_stem(self):
+        data = make_image(mode="RGB", fmt="JPEG")
+        jpeg = self.create_book(SimpleUploadedFile("cover.jpg", data))
+        png = self.create_book(SimpleUploadedFile("cover.png", make_image()))
+        self.assertNotEqual(jpeg.photo_thumb, png.photo_thumb)
+
+        delete_variants(jpeg.photo)
+        for name in variant_names(png.photo.name):
+            self.assertTrue(default_storage.exists(name), name)
+
+    def test_pending(self):
+        book = Book.objects.create(
+            title="Book_1",
+            year=2000,
+            summary="",
+            isbn=1,
+            price=1,
+            photo=SimpleUploadedFile("cover.png", make_image()),
+        )
+        self.assertEqual(PhotoStatus.PENDING, book.photo_status)
+        self.assertEqual(book.photo.url, book.photo_thumb)
+        name = variant_name(book.photo.name, "thumb", "webp")
+        self.assertFalse(default_storage.exists(name))
+
+    def test_ready_marks_book_stale(self):
+        book = Book.objects.create(
+            title="Book_1",
+            year=2000,
+            summary="",
+            isbn=1,
+            price=1,
+            photo=SimpleUploadedFile("cover.png", make_image()),
+        )
+        Book.objects.filter(pk=book.pk).update(payload_json="{}")
+        version = get_version()
+
+        self.assertEqual([PhotoStatus.READY], process_photos([book.photo]))
+        updated_at = book.updated_at
+        book.refresh_from_db()
+        self.assertIsNone(book.payload_json)
+        self.assertGreater(book.updated_at, updated_at)
+        self.assertGreater(get_version(), version)
+
+    def test_exif(self):
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+        exif[ExifTags.Base.Make] = "Camera"
+        data = make_image(mode="RGB", fmt="JPEG", exif=exif)
+        book = self.create_book(SimpleUploadedFile("cover.jpg", data))
+
+        with Image.open(default_storage.path(book.photo.name)) as image:
+            self.assertEqual((1200, 800), image.size)
+            self.assertFalse(image.getexif())
+        name = variant_name(book.photo.name, "thumb", "jpeg")
+        with Image.open(default_storage.path(name)) as image:
+            self.assertEqual((100, 67), image.size)
+            self.assertFalse(image.getexif())
+
+    def test_invalid(self):
+        book = self.create_book(SimpleUploadedFile("cover.png", b"not an image"))
+        self.assertEqual(PhotoStatus.FAILED, book.photo_status)
+        self.assertEqual(book.photo.url, book.photo_card)
+
+    def test_worker_process(self):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            original, variants = executor.submit(render_photo, make_image()).result()
+        self.assertIsNone(original)
+        self.assertEqual(len(VARIANTS) * 2, len(variants))
+
+    def test_command(self):
+        book = self.create_book(SimpleUploadedFile("cover.png", make_image()))
+        Book.objects.filter(pk=book.pk).update(photo_status=PhotoStatus.FAILED)
+        delete_variants(book.photo)
+
+        out = StringIO()
+        call_command("process_photos", stdout=out)
+        self.assertIn("ready=1", out.getvalue())
+        book.refresh_from_db()
+        self.assertEqual(PhotoStatus.READY, book.photo_status)
+        for name in variant_names(book.photo.name):
+            self.assertTrue(default_storage.exists(name), name)
+
+    def test_missing_original(self):
+        book = self.create_book("images/missing.jpg")
+        self.assertEqual(book.photo.url, book.photo_detail)
+        book = Book.objects.get(pk=book.pk)
+        self.assertEqual(PhotoStatus.FAILED, book.photo_status)
+        with mock.patch("catalog.thumbnails.generate_variants") as generate:
+            self.assertEqual(book.photo.url, book.photo_thumb)
+        generate.assert_not_called()
+        self.assertEqual("", Author(photo="").photo_thumb)
+
+
+class ConnectionPoolTestCase(TestCase):
+    def make_pool(self, **options):
+        pool = ConnectionPool(**{"max_size": 2, **options})
+        self.addCleanup(pool.close_all)
+        return pool
+
+    def connect(self):
+        # Not connection.get_new_connection(): with DJANGO_DB_POOL_SIZE set it
+        # takes a slot of the project's pool.
+        return psycopg2.connect(**connection.get_connection_params())
+
+    def test_reuse(self):
+        pool = self.make_pool()
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        second = pool.acquire(self.connect)
+        self.assertIs(first, second)
+        stats = pool.get_stats()
+        self.assertEqual((1, 1, 0), (stats["connects"], stats["in_use"], stats["idle"]))
+        pool.release(second)
+
+    def test_health_check(self):
+        pool = self.make_pool(check_after=0)
+        conn = pool.acquire(self.connect)
+        pid = conn.get_backend_pid()
+        pool.release(conn)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(%s)", [pid])
+
+        conn = pool.acquire(self.connect)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        self.assertNotEqual(pid, conn.get_backend_pid())
+        self.assertEqual(1, pool.get_stats()["reconnects"])
+        pool.release(conn)
+
+    def test_wait_and_timeout(self):
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        conn = pool.acquire(self.connect)
+        with self.assertRaises(OperationalError):
+            pool.acquire(self.connect)
+
+        pool.timeout = 5
+        timer = threading.Timer(0.05, pool.release, [conn])
+        timer.start()
+        self.assertIs(conn, pool.acquire(self.connect))
+        timer.join()
+        stats = pool.get_stats()
+        self.assertEqual((1, 1), (stats["waits"], stats["timeouts"]))
+        self.assertGreater(stats["wait_seconds"], 0)
+        pool.release(conn)
+
+    def test_reset_fails(self):
+        pool = self.make_pool(max_size=1)
+        conn = pool.acquire(self.connect)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        error = psycopg2.InterfaceError("connection already closed")
+        with mock.patch.object(ConnectionPool, "_reset", side_effect=error):
+            pool.release(conn)
+        self.assertTrue(conn.closed)
+        stats = pool.get_stats()
+        self.assertEqual((0, 0), (stats["in_use"], stats["idle"]))
+        pool.release(pool.acquire(self.connect))
+
+    @mock.patch.dict(pooled_base._pools, clear=True)
+    def test_database_wrapper(self):
+        settings_dict = {**connection.settings_dict, "POOL": {"max_size": 2}}
+        wrapper = DatabaseWrapper(settings_dict, alias=connection.alias)
+        pool = wrapper.pool
+        self.addCleanup(pool.close_all)
+        for _ in range(3):
+            with wrapper.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            wrapper.close()
+        stats = pool.get_stats()
+        self.assertEqual((1, 0, 1), (stats["connects"], stats["in_use"], stats["idle"]))
+
+    @mock.patch.dict(pooled_base._pools, clear=True)
+    def test_closed_in_transaction(self):
+        settings_dict = {
+            **connection.settings_dict,
+            "POOL": {"max_size": 1, "check_after": 0},
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias=connection.alias)
+        self.addCleanup(wrapper.pool.close_all)
+        wrapper.ensure_connection()
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        wrapper.close()
+
+        # Reused after the health check, the connection is set up as a new one.
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        self.assertTrue(wrapper.connection.autocommit)
+        self.assertEqual(1, wrapper.pool.get_stats()["connects"])
+        wrapper.close()
+
+
+@override_settings(CATALOG_DB_REPLICAS=["replica_0"], CATALOG_REPLICA_READS=True)
+class ReplicaRouterTestCase(TestCase):
+    def setUp(self) -> None:
+        self.router = ReplicaRouter()
+        self.addCleanup(end_request)
+
+    def test_safe_request(self):
+        start_request(safe=True, pinned=False)
+        self.assertEqual("replica_0", self.router.db_for_read(Book))
+        self.assertEqual("replica_0", self.router.db_for_read(UserBookRelation))
+        self.assertIsNone(self.router.db_for_read(Genre))
+
+        # Reads after a write in the same request see it.
+        self.assertEqual("default", self.router.db_for_write(Book))
+        self.assertIsNone(self.router.db_for_read(Book))
+
+    def test_primary(self):
+        self.assertIsNone(self.router.db_for_read(Book))
+        start_request(safe=False, pinned=False)
+        self.assertIsNone(self.router.db_for_read(Book))
+        start_request(safe=True, pinned=True)
+        self.assertIsNone(self.router.db_for_read(Author))
+        with override_settings(CATALOG_DB_REPLICAS=[]):
+            start_request(safe=True, pinned=False)
+            self.assertIsNone(self.router.db_for_read(Book))
+        with override_settings(CATALOG_REPLICA_READS=False):
+            start_request(safe=True, pinned=False)
+            self.assertIsNone(self.router.db_for_read(Book))
+
+    def test_shared_cache(self):
+        self.assertTrue(uses_shared_cache())
+        self.assertTrue(reads_primary())
+        start_request(safe=True, pinned=True)
+        self.assertTrue(uses_shared_cache())
+        self.assertTrue(reads_primary())
+        start_request(safe=True, pinned=False)
+        self.assertTrue(uses_shared_cache())
+        self.assertFalse(reads_primary())
+        self.router.db_for_write(Book)
+        self.assertFalse(uses_shared_cache())
+        start_request(safe=False, pinned=False)
+        self.assertFalse(uses_shared_cache())
+
+    def test_can_store(self):
+        bump_version()
+        self.assertTrue(can_store())
+        start_request(safe=True, pinned=False)
+        self.assertFalse(can_store())
+        with override_settings(CATALOG_REPLICA_PIN_SECONDS=0):
+            self.assertTrue(can_store())
+
+    def test_migrate(self):
+        self.assertFalse(self.router.allow_migrate("replica_0", "catalog"))
+        self.assertIsNone(self.router.allow_migrate("default", "catalog"))
+
+
+class GenerateCatalogDataTestCase(TestCase):
+    def generate(self, **options):
+        options = {
+            "books": 30,
+            "authors": 5,
+            "users": 4,
+            "relations": 50,
+            "instances": 20,
+            "batch_size": 7,
+            **options,
+        }
+        call_command("generate_catalog_data", stdout=StringIO(), **options)
+
+    def test_generate(self):
+        self.generate()
+        self.assertEqual(30, Book.objects.count())
+        self.assertEqual(5, Author.objects.count())
+        self.assertEqual(50, UserBookRelation.objects.count())
+        self.assertEqual(20, BookInstance.objects.count())
+        duplicates = (
+            UserBookRelation.objects.values("user", "book")
+            .annotate(count=Count("pk"))
+            .filter(count__gt=1)
+        )
+        self.assertFalse(duplicates.exists())
+
+        # The counters the signals would have kept are filled in.
+        book = Book.objects.annotate(
+            likes=Count("userbookrelation", filter=Q(userbookrelation__like=True)),
+            relations=Count("userbookrelation"),
+        ).first()
+        self.assertEqual(book.likes, book.likes_count)
+        self.assertEqual(book.relations, book.readers_count)
+        self.assertEqual(2, len(book.author_names.split(", ")))
+        self.assertIsNotNone(book.search_vector)
+        self.assertEqual(30, get_catalog_stats()["num_books"])
+
+    def test_too_many_relations(self):
+        with self.assertRaises(CommandError):
+            self.generate(books=2, users=2, relations=5)
+
+
+class BenchmarkCatalogTestCase(TestCase):
+    def setUp(self) -> None:
+        call_command(
+            "generate_catalog_data",
+            books=5,
+            authors=3,
+            users=2,
+            relations=4,
+            instances=3,
+            stdout=StringIO(),
+        )
+        self.options = {"requests": 3, "warmup": 1, "stdout": StringIO()}
+
+    def test_baseline(self):
+        with NamedTemporaryFile(suffix=".json") as file:
+            call_command("benchmark_catalog", save_baseline=file.name, **self.options)
+            baseline = json.load(file)
+            self.assertEqual(set(SCENARIOS), set(baseline))
+            self.assertEqual(
+                {"rps", "p50_ms", "p99_ms", "queries"}, set(baseline["book-list"])
+            )
+
+            baseline["book-detail"]["queries"] = 1
+            file.seek(0)
+            file.truncate()
+            file.write(json.dumps(baseline).encode())
+            file.flush()
+            with self.assertRaisesMessage(CommandError, "book-detail"):
+                call_command(
+                    "benchmark_catalog",
+                    baseline=file.name,
+                    tolerance=100,
+                    scenario=["book-detail"],
+                    **self.options,
+                )
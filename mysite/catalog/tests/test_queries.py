@@ -0,0 +1,359 @@
+import json
+import re
+from collections import Counter
+from itertools import cycle
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework import serializers as drf_serializers
+
+from catalog import serializers, urls
+from catalog.cache import get_cache
+from catalog.export import export_queryset
+from catalog.models import (
+    Author,
+    Book,
+    BookInstance,
+    Genre,
+    Language,
+    Publisher,
+    Status,
+    UserBookRelation,
+)
+from catalog.serializers import (
+    READERS_PREVIEW,
+    add_loan_names,
+    reader_relations,
+    readers_prefetch,
+)
+from catalog.stats import AVAILABLE_STATUS
+from catalog.views import BookViewSet
+
+# Every view is rendered with this many books, authors, readers and
+# instances, then with more; the query count must not change.
+SMALL, LARGE = 2, 5
+
+STRINGS = re.compile(r"'(?:[^']|'')*'")
+NUMBERS = re.compile(r"\b\d+\b")
+
+
+@dataclass(frozen=True)
+class UrlBudget:
+    """
+    Most queries a request to ``path`` may run, session and user included.
+    The path is formatted with the pks of the seeded objects.
+    """
+
+    name: str
+    path: str
+    queries: int
+    method: str = "get"
+    data: Callable[["QueryBudgetTestCase"], object] | None = None
+
+
+@dataclass(frozen=True)
+class SerializerBudget:
+    """Most queries loading ``objects()`` and serializing them may run."""
+
+    serializer: type
+    objects: Callable[[], object]
+    queries: int
+
+
+# A new rate on every request, so the PATCH always writes.
+RATES = cycle(range(1, 6))
+
+
+def relation_rows(case) -> list[dict]:
+    return [{"user": case.user.pk, "book": pk, "like": True} for pk in case.book_ids]
+
+
+URL_BUDGETS = [
+    UrlBudget("index", "/", 4),
+    UrlBudget("logout", "/accounts/logout/", 4),
+    UrlBudget("about", "/about/", 2),
+    UrlBudget("contact", "/contact/", 2),
+    UrlBudget("books", "/books/", 4),
+    UrlBudget("book-detail", "/books/{book}/", 7),
+    UrlBudget("authors-list", "/authors/", 4),
+    UrlBudget("authors-detail", "/authors/{author}/", 3),
+    UrlBudget("my-borrowed", "/mybooks/", 4),
+    UrlBudget("edit-authors-list", "/edit_authors/", 4),
+    UrlBudget("author-add", "/add_author/", 2),
+    UrlBudget("edit-author", "/edit_author/{author}/", 3),
+    UrlBudget("del-author", "/delete_author/{spare_author}/", 5),
+    UrlBudget("edit_books", "/edit_books/", 4),
+    UrlBudget("book_create", "/book_create/", 8),
+    UrlBudget("book_update", "/book_update/{book}/", 11),
+    UrlBudget("book_delete", "/book_delete/{book}/", 3),
+    UrlBudget("book-list", "/book/", 6),
+    UrlBudget("book-cache-stats", "/book/cache_stats/", 2),
+    UrlBudget("book-db-stats", "/book/db_stats/", 2),
+    UrlBudget("book-export", "/book/export/", 4),
+    UrlBudget("book-detail", "/book/{book}/", 6),
+    UrlBudget("book-readers", "/book/{book}/readers/", 4),
+    UrlBudget(
+        "userbookrelation-bulk",
+        "/book_relation/bulk/",
+        8,
+        method="post",
+        data=relation_rows,
+    ),
+    UrlBudget(
+        "userbookrelation-detail",
+        "/book_relation/{book}/",
+        4,
+        method="patch",
+        data=lambda case: {"like": True, "rate": next(RATES)},
+    ),
+    UrlBudget("overdue-loan-list", "/overdue_loans/", 5),
+    UrlBudget("admin:catalog_author_changelist", "/admin/catalog/author/", 5),
+    UrlBudget("admin:catalog_book_changelist", "/admin/catalog/book/", 7),
+    UrlBudget(
+        "admin:catalog_bookinstance_changelist", "/admin/catalog/bookinstance/", 7
+    ),
+    UrlBudget(
+        "admin:catalog_userbookrelation_changelist",
+        "/admin/catalog/userbookrelation/",
+        5,
+    ),
+    UrlBudget(
+        "admin:catalog_catalogstats_changelist", "/admin/catalog/catalogstats/", 5
+    ),
+    UrlBudget("admin:catalog_genre_changelist", "/admin/catalog/genre/", 5),
+    UrlBudget("admin:catalog_language_changelist", "/admin/catalog/language/", 5),
+    UrlBudget("admin:catalog_publisher_changelist", "/admin/catalog/publisher/", 5),
+    UrlBudget("admin:catalog_status_changelist", "/admin/catalog/status/", 5),
+]
+
+SERIALIZER_BUDGETS = [
+    SerializerBudget(
+        serializers.BookSerializer,
+        lambda: BookViewSet.queryset.prefetch_related(
+            readers_prefetch(READERS_PREVIEW)
+        ),
+        2,
+    ),
+    SerializerBudget(
+        serializers.BookReaderSerializer,
+        lambda: [relation.user for relation in reader_relations()],
+        1,
+    ),
+    SerializerBudget(serializers.BookExportSerializer, export_queryset, 2),
+    SerializerBudget(serializers.ExportAuthorSerializer, Author.objects.all, 1),
+    SerializerBudget(
+        serializers.UserBookRelationSerializer, UserBookRelation.objects.all, 1
+    ),
+    SerializerBudget(
+        serializers.OverdueLoanSerializer,
+        lambda: add_loan_names(list(BookInstance.objects.overdue_loans())),
+        3,
+    ),
+]
+
+# Input-only serializers, they never touch the database.
+SERIALIZERS_WITHOUT_BUDGET = {serializers.RelationRowSerializer}
+
+
+def sql_shape(sql: str) -> str:
+    return NUMBERS.sub("?", STRINGS.sub("?", sql))
+
+
+def sql_report(queries: list[str]) -> str:
+    """
+    The statements of a request grouped by shape (literals replaced), the
+    repeated ones, typically an N+1, first.
+    """
+    shapes = Counter(sql_shape(sql) for sql in queries)
+    return "\n".join(f"  {count} x {sql}" for sql, count in shapes.most_common())
+
+
+class QueryBudgetTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_superuser(
+            username="admin", first_name="Admin", last_name="User"
+        )
+        self.genre = Genre.objects.create(name="Роман")
+        self.language = Language.objects.create(name="Русский")
+        self.publisher = Publisher.objects.create(name="Издательство")
+        self.available = Status.objects.create(pk=AVAILABLE_STATUS, name="На складе")
+        self.authors, self.book_ids = [], []
+
+    def seed(self, count: int) -> None:
+        for _ in range(count):
+            number = len(self.book_ids)
+            author = Author.objects.create(
+                first_name=f"Test_{number}", last_name=f"Author_{number}"
+            )
+            self.authors.append(author)
+            book = Book.objects.create(
+                title=f"Book_{number}",
+                year=2000,
+                isbn=number,
+                price=100 + number,
+                genre=self.genre,
+                language=self.language,
+                publisher=self.publisher,
+                owner=self.user,
+            )
+            self.book_ids.append(book.pk)
+            book.author.add(*self.authors[-2:])
+            BookInstance.objects.create(
+                book=book,
+                inv_num=str(number),
+                status=self.available,
+                due_back=date.today() - timedelta(days=1),
+                borrower=self.user,
+            )
+            reader = get_user_model().objects.create(
+                username=f"reader_{number}", first_name="Reader", last_name="User"
+            )
+            UserBookRelation.objects.bulk_create(
+                UserBookRelation(user=reader, book_id=pk, like=True, rate=5)
+                for pk in self.book_ids
+            )
+
+    def request(self, budget: UrlBudget):
+        self.client.force_login(self.user)
+        spare = Author.objects.create(first_name="Spare", last_name="Author")
+        path = budget.path.format(
+            book=self.book_ids[0], author=self.authors[0].pk, spare_author=spare.pk
+        )
+        kwargs = {}
+        if budget.data is not None:
+            kwargs = {
+                "data": json.dumps(budget.data(self)),
+                "content_type": "application/json",
+            }
+        # Measure the uncached path: no cached responses and stale payloads.
+        get_cache().clear()
+        Book.objects.update(payload_json=None)
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, budget.method)(path, **kwargs)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertLess(response.status_code, 400, path)
+        return [query["sql"] for query in context.captured_queries]
+
+    def measure_urls(self) -> dict:
+        measured = {}
+        for budget in URL_BUDGETS:
+            # The first request fills process-wide caches (content types).
+            self.request(budget)
+            measured[budget] = self.request(budget)
+        return measured
+
+    def check(self, label: str, budget: int, small: list[str], large: list[str]):
+        with self.subTest(label):
+            if len(large) != len(small) or len(large) > budget:
+                self.fail(
+                    f"{label}: {len(small)} queries with {SMALL} rows, "
+                    f"{len(large)} with {LARGE} rows, budget {budget}\n"
+                    f"{sql_report(large)}"
+                )
+
+    def test_urls(self):
+        self.seed(SMALL)
+        small = self.measure_urls()
+        self.seed(LARGE - SMALL)
+        large = self.measure_urls()
+        for budget in URL_BUDGETS:
+            label = f"{budget.name} {budget.method.upper()} {budget.path}"
+            self.check(label, budget.queries, small[budget], large[budget])
+
+    def serialize(self, budget: SerializerBudget) -> list[str]:
+        with CaptureQueriesContext(connection) as context:
+            budget.serializer(budget.objects(), many=True).data
+        return [query["sql"] for query in context.captured_queries]
+
+    def test_serializers(self):
+        self.seed(SMALL)
+        small = [self.serialize(budget) for budget in SERIALIZER_BUDGETS]
+        self.seed(LARGE - SMALL)
+        for budget, queries in zip(SERIALIZER_BUDGETS, small):
+            large = self.serialize(budget)
+            self.check(budget.serializer.__name__, budget.queries, queries, large)
+
+    def test_every_url_has_budget(self):
+        paths = {
+            budget.path.format(book=1, author=1, spare_author=1): budget.name
+            for budget in URL_BUDGETS
+        }
+        routes = {resolve(path).route for path in paths}
+        for pattern in urls.urlpatterns:
+            self.assertIn(str(pattern.pattern), routes, pattern.name)
+
+        names = {budget.name for budget in URL_BUDGETS}
+        for model in admin.site._registry:
+            if model._meta.app_label == "catalog":
+                name = f"admin:catalog_{model._meta.model_name}_changelist"
+                self.assertIn(name, names)
+
+        for path, name in paths.items():
+            self.assertEqual(name, resolve(path).view_name, path)
+
+    def test_every_serializer_has_budget(self):
+        covered = {budget.serializer for budget in SERIALIZER_BUDGETS}
+        for value in vars(serializers).values():
+            if (
+                isinstance(value, type)
+                and issubclass(value, drf_serializers.Serializer)
+                and value.__module__ == serializers.__name__
+            ):
+                self.assertIn(value, covered | SERIALIZERS_WITHOUT_BUDGET)
+
+
+class IndexUsageTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create(username="test_user")
+        self.status = Status.objects.create(pk=AVAILABLE_STATUS, name="На складе")
+        self.books = [
+            Book.objects.create(title=f"Book_{i}", year=2000 + i, isbn=i, price=100 + i)
+            for i in range(3)
+        ]
+        for book in self.books:
+            BookInstance.objects.create(
+                book=book, inv_num="1", status=self.status, borrower=self.user
+            )
+            UserBookRelation.objects.create(user=self.user, book=book, like=True)
+
+    def plan(self, queryset) -> str:
+        # Tiny test tables are cheaper to scan; ask whether an index can serve.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def test_relation_lookup(self):
+        queryset = UserBookRelation.objects.filter(user=self.user, book=self.books[0])
+        self.assertIn("relation_user_book_unique", self.plan(queryset))
+
+    def test_relation_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserBookRelation.objects.create(user=self.user, book=self.books[0])
+
+    def test_borrowed_books(self):
+        queryset = (
+            BookInstance.objects.filter(borrower=self.user, status=AVAILABLE_STATUS)
+            .order_by("due_back")
+        )
+        self.assertIn("instance_borrower_status_idx", self.plan(queryset))
+
+    def test_overdue_loans(self):
+        queryset = BookInstance.objects.overdue_loans()[:20]
+        self.assertIn("instance_overdue_idx", self.plan(queryset))
+
+    def test_book_ordering_and_filters(self):
+        for queryset, index in (
+            (Book.objects.order_by("title", "id")[:20], "book_title_id_idx"),
+            (Book.objects.order_by("year", "id")[:20], "book_year_id_idx"),
+            (Book.objects.filter(price=101), "book_price_idx"),
+        ):
+            with self.subTest(index):
+                self.assertIn(index, self.plan(queryset))
@@ -0,0 +1,256 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from catalog.cache import get_cache
+from catalog.models import (
+    Author,
+    Book,
+    BookInstance,
+    Genre,
+    Status,
+    UserBookRelation,
+)
+from catalog.stats import AVAILABLE_STATUS, FEATURED_BOOKS, catalog_counts
+from catalog.thumbnails import PhotoStatus
+
+
+class BookDetailViewTestCase(TestCase):
+    def setUp(self) -> None:
+        self.author = Author.objects.create(
+            first_name="Test", last_name="Author", about="About"
+        )
+        self.status = Status.objects.create(name="На складе")
+        self.book_1 = Book.objects.create(
+            title="Book_1",
+            year=2000,
+            summary="Summary book_1",
+            isbn=123456789,
+            price=159,
+            photo="images/book_1.jpg",
+            photo_status=PhotoStatus.READY,
+        )
+        self.book_1.author.add(self.author)
+        # "book-detail" is also the name of the API route, which wins in reverse()
+        self.url = f"/books/{self.book_1.pk}/"
+
+    def assertModified(self, etag, modified=True):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200 if modified else 304, response.status_code)
+        return response["ETag"]
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertModified(etag, modified=False)
+
+    def test_related_changes(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        instance = BookInstance.objects.create(
+            book=self.book_1, inv_num="1", status=self.status
+        )
+        etag = self.assertModified(etag)
+        self.status.name = "Выдан"
+        self.status.save()
+        etag = self.assertModified(etag)
+        instance.delete()
+        etag = self.assertModified(etag)
+
+        self.author.last_name = "Renamed"
+        self.author.save()
+        etag = self.assertModified(etag)
+        self.book_1.author.clear()
+        etag = self.assertModified(etag)
+        self.assertModified(etag, modified=False)
+
+    def test_queries(self):
+        # validators, book, authors, instances with statuses, status counts
+        BookInstance.objects.create(book=self.book_1, inv_num="1", status=self.status)
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+        issued = Status.objects.create(name="Выдан")
+        for i in range(2, 12):
+            BookInstance.objects.create(
+                book=self.book_1, inv_num=str(i), status=issued if i % 2 else None
+            )
+        self.book_1.author.add(
+            Author.objects.create(first_name="Second", last_name="Author", about="")
+        )
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        counts = {
+            row["status__name"]: row["count"]
+            for row in response.context["status_counts"]
+        }
+        self.assertEqual({"На складе": 1, "Выдан": 5, None: 5}, counts)
+        self.assertContains(response, "Без статуса:</strong> 5")
+
+    def test_user_in_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.force_login(get_user_model().objects.create(username="test_user"))
+        self.assertModified(etag)
+
+
+class IndexViewTestCase(TestCase):
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.author = Author.objects.create(
+            first_name="Test", last_name="Author", about="About"
+        )
+        self.available = Status.objects.create(pk=AVAILABLE_STATUS, name="На складе")
+        self.issued = Status.objects.create(pk=AVAILABLE_STATUS + 1, name="Выдан")
+        self.books = [
+            Book.objects.create(
+                title=f"Book_{i}",
+                year=2000,
+                summary=f"Summary book_{i}",
+                isbn=i,
+                price=100 + i,
+                photo="images/book_1.jpg",
+                photo_status=PhotoStatus.READY,
+            )
+            for i in range(FEATURED_BOOKS + 2)
+        ]
+        BookInstance.objects.create(
+            book=self.books[0], inv_num="1", status=self.available
+        )
+        BookInstance.objects.create(book=self.books[0], inv_num="2", status=self.issued)
+
+    def test_counts(self):
+        with self.assertNumQueries(1):
+            counts = catalog_counts()
+        expected = {
+            "num_books": FEATURED_BOOKS + 2,
+            "num_instances": 2,
+            "num_instances_available": 1,
+            "num_authors": 1,
+        }
+        self.assertEqual(expected, counts)
+
+        BookInstance.objects.all().delete()
+        self.assertEqual(
+            {**expected, "num_instances": 0, "num_instances_available": 0},
+            catalog_counts(),
+        )
+
+    def test_featured_books(self):
+        user = get_user_model().objects.create(username="test_user")
+        UserBookRelation.objects.create(user=user, book=self.books[-1], like=True)
+
+        response = self.client.get("/")
+        self.assertEqual(200, response.status_code)
+        books = response.context["books"]
+        self.assertEqual(FEATURED_BOOKS, len(books))
+        self.assertEqual(self.books[-1].pk, books[0].pk)
+        self.assertEqual(FEATURED_BOOKS + 2, response.context["num_books"])
+
+    def test_cached(self):
+        self.client.get("/")
+        # Only the CatalogStats row is read once the featured books are cached.
+        with self.assertNumQueries(1):
+            self.client.get("/")
+
+        BookInstance.objects.create(
+            book=self.books[1], inv_num="3", status=self.available
+        )
+        response = self.client.get("/")
+        self.assertEqual(2, response.context["num_instances_available"])
+
+
+class ListViewsTestCase(TestCase):
+    def setUp(self) -> None:
+        self.genre = Genre.objects.create(name="Роман")
+        self.authors = [
+            Author.objects.create(
+                first_name=f"Test_{i}",
+                last_name=f"Author_{i}",
+                about="About",
+                photo="images/author.jpg",
+                photo_status=PhotoStatus.READY,
+            )
+            for i in range(4)
+        ]
+
+    def create_books(self, count):
+        for i in range(count):
+            book = Book.objects.create(
+                title=f"Book_{i}",
+                year=2000,
+                summary=f"Summary book_{i}",
+                isbn=i,
+                price=100 + i,
+                genre=self.genre,
+                photo="images/book_1.jpg",
+                photo_status=PhotoStatus.READY,
+            )
+            book.author.add(*self.authors[:2])
+
+    def test_author_names(self):
+        self.create_books(1)
+        book = Book.objects.get()
+        self.assertEqual("Author_0, Author_1", book.display_author())
+
+        self.authors[0].last_name = "Renamed"
+        self.authors[0].save()
+        book.author.add(self.authors[2])
+        self.authors[1].delete()
+        book.refresh_from_db()
+        self.assertEqual("Renamed, Author_2", book.author_names)
+
+        book.author.clear()
+        book.refresh_from_db()
+        self.assertEqual("", book.author_names)
+
+    def test_book_list_queries(self):
+        # paginator COUNT and the page itself, whatever the page size
+        self.create_books(1)
+        with self.assertNumQueries(2):
+            response = self.client.get("/books/")
+        self.create_books(5)
+        with self.assertNumQueries(2):
+            response = self.client.get("/books/")
+        self.assertContains(response, "Author_0, Author_1")
+        self.assertContains(response, "Роман")
+
+    def test_author_list_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/authors/")
+        self.assertContains(response, "Author_3")
+
+
+class TimingMiddlewareTestCase(TestCase):
+    def setUp(self) -> None:
+        book = Book.objects.create(
+            title="Book_1",
+            year=2000,
+            isbn=1,
+            price=100,
+            photo="images/book_1.jpg",
+            photo_status=PhotoStatus.READY,
+        )
+        book.author.add(Author.objects.create(first_name="Test", last_name="Author"))
+
+    @override_settings(CATALOG_TIMING_SAMPLE_RATE=1)
+    def test_sampled(self):
+        with self.assertLogs("catalog.timing") as logs:
+            response = self.client.get("/books/")
+        header = response["Server-Timing"]
+        metrics = [metric.split(";")[0] for metric in header.split(", ")]
+        self.assertEqual(["db", "template", "total"], metrics)
+        self.assertIn('desc="2 queries"', header)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual("books", record["url_name"])
+        self.assertEqual(
+            ("GET", 200, 2), (record["method"], record["status"], record["queries"])
+        )
+        self.assertIn("catalog_book", record["slowest_sql"])
+        self.assertGreater(record["total_ms"], 0)
+
+    @override_settings(CATALOG_TIMING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        with self.assertNoLogs("catalog.timing"):
+            response = self.client.get("/books/")
+        self.assertNotIn("Server-Timing", response)
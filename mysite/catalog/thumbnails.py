@@ -0,0 +1,177 @@
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import models
+from django.db.models.fields.files import FieldFile
+from django.utils.html import format_html
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {
+    "thumb": (100, 100),
+    "card": (300, 300),
+    "detail": (600, 600),
+}
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+
+class PhotoStatus(models.TextChoices):
+    NEW = "new", "Не обработано"
+    PENDING = "pending", "Обрабатывается"
+    READY = "ready", "Готово"
+    FAILED = "failed", "Ошибка обработки"
+
+
+def variant_name(name: str, variant: str, fmt: str) -> str:
+    """
+    images/book.jpg -> images/book.jpg.thumb.webp, next to the original. The
+    original extension is kept so book.jpg and book.png do not share variants.
+    """
+    return f"{name}.{variant}.{fmt}"
+
+
+def variant_names(name: str) -> list[str]:
+    return [
+        variant_name(name, variant, fmt) for variant in VARIANTS for fmt in FORMATS
+    ]
+
+
+def render_variant(image: Image.Image, variant: str, fmt: str) -> bytes:
+    pil_format, options = FORMATS[fmt]
+    resized = image.copy()
+    resized.thumbnail(VARIANTS[variant], Image.Resampling.LANCZOS)
+    if pil_format == "JPEG" and resized.mode != "RGB":
+        resized = resized.convert("RGB")
+    elif resized.mode not in ("RGB", "RGBA"):
+        resized = resized.convert("RGBA")
+    buffer = BytesIO()
+    resized.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def render_photo(data: bytes) -> tuple[bytes | None, dict[tuple[str, str], bytes]]:
+    """
+    Decodes an uploaded image, applies its EXIF orientation and renders every
+    variant. Returns the original re-encoded without EXIF (None when it had
+    none) and the variants by (variant, format). Touches neither Django nor
+    storage, so it can run in a worker process.
+    """
+    with Image.open(BytesIO(data)) as image:
+        image.load()
+        pil_format = image.format
+        has_exif = bool(image.getexif())
+        image = ImageOps.exif_transpose(image)
+
+    original = None
+    if has_exif:
+        buffer = BytesIO()
+        image.save(buffer, pil_format)
+        original = buffer.getvalue()
+
+    variants = {
+        (variant, fmt): render_variant(image, variant, fmt)
+        for variant in VARIANTS
+        for fmt in FORMATS
+    }
+    return original, variants
+
+
+def _replace(storage, name: str, content: bytes) -> str:
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(content))
+
+
+def store_photo(photo: FieldFile, original: bytes | None, variants: dict) -> None:
+    storage = photo.storage
+    if original is not None:
+        _replace(storage, photo.name, original)
+    for (variant, fmt), content in variants.items():
+        _replace(storage, variant_name(photo.name, variant, fmt), content)
+
+
+def generate_variants(photo: FieldFile, strip_original: bool = False) -> None:
+    """
+    Renders the variants of the photo in this process and stores them,
+    replacing existing ones. The original is rewritten only on request.
+    """
+    with photo.storage.open(photo.name, "rb") as file:
+        original, variants = render_photo(file.read())
+    store_photo(photo, original if strip_original else None, variants)
+
+
+def delete_variants(photo: FieldFile) -> None:
+    for name in variant_names(photo.name):
+        if photo.storage.exists(name):
+            photo.storage.delete(name)
+
+
+def render_missing_variants(photo: FieldFile) -> str:
+    """
+    Renders the variants of a photo that never had them, such as one
+    uploaded before thumbnails existed, and records the outcome so an
+    unreadable image is not retried on every request.
+    """
+    try:
+        generate_variants(photo)
+        status = PhotoStatus.READY
+    except (OSError, UnidentifiedImageError) as error:
+        logger.warning("Cannot render variants of %s: %s", photo.name, error)
+        status = PhotoStatus.FAILED
+    instance = photo.instance
+    type(instance).objects.filter(
+        pk=instance.pk, photo=photo.name, photo_status=PhotoStatus.NEW
+    ).update(photo_status=status)
+    instance.photo_status = status
+    return status
+
+
+def variant_url(photo: FieldFile, variant: str, fmt: str = "webp") -> str:
+    """
+    URL of a size variant, decided from photo_status without asking the
+    storage. Until the background processing has finished, or when it has
+    failed, the original is served; photos without variants get them
+    rendered on first use.
+    """
+    if not photo:
+        return ""
+    status = getattr(photo.instance, "photo_status", PhotoStatus.READY)
+    if status == PhotoStatus.NEW:
+        status = render_missing_variants(photo)
+    if status != PhotoStatus.READY:
+        return photo.url
+    return photo.storage.url(variant_name(photo.name, variant, fmt))
+
+
+def picture_html(photo: FieldFile, variant: str, alt: str = "", css_class: str = ""):
+    if not photo:
+        return ""
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp">'
+        '<img src="{}" alt="{}" class="{}" loading="lazy"></picture>',
+        variant_url(photo, variant, "webp"),
+        variant_url(photo, variant, "jpeg"),
+        alt,
+        css_class,
+    )
+
+
+class PhotoVariantsMixin:
+    """URLs of the photo variants for models with a ``photo`` ImageField."""
+
+    @property
+    def photo_thumb(self) -> str:
+        return variant_url(self.photo, "thumb")
+
+    @property
+    def photo_card(self) -> str:
+        return variant_url(self.photo, "card")
+
+    @property
+    def photo_detail(self) -> str:
+        return variant_url(self.photo, "detail")
@@ -0,0 +1,148 @@
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_SQL_LENGTH = 500
+
+
+@dataclass
+class RequestTimings:
+    """SQL and rendering timings of one sampled request, in seconds."""
+
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db: float = 0.0
+    slowest: float = 0.0
+    slowest_sql: str = ""
+    spans: dict = field(default_factory=lambda: defaultdict(float))
+    running: set = field(default_factory=set)
+
+    def add_query(self, sql: str, duration: float) -> None:
+        self.queries += 1
+        self.db += duration
+        if duration > self.slowest:
+            self.slowest = duration
+            self.slowest_sql = sql[:SLOWEST_SQL_LENGTH]
+
+    def server_timing(self, total: float) -> str:
+        metrics = [f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"']
+        metrics += [
+            f"{name};dur={duration * 1000:.1f}"
+            for name, duration in sorted(self.spans.items())
+        ]
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def as_log(self, total: float) -> dict:
+        return {
+            "queries": self.queries,
+            "db_ms": round(self.db * 1000, 1),
+            **{
+                f"{name}_ms": round(duration * 1000, 1)
+                for name, duration in sorted(self.spans.items())
+            },
+            "total_ms": round(total * 1000, 1),
+            "slowest_ms": round(self.slowest * 1000, 1),
+            "slowest_sql": self.slowest_sql,
+        }
+
+
+_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "catalog_timings", default=None
+)
+
+
+def start_timing() -> RequestTimings | None:
+    """Starts timing the current request if it is sampled."""
+    if random.random() >= settings.CATALOG_TIMING_SAMPLE_RATE:
+        return None
+    timings = RequestTimings()
+    _timings.set(timings)
+    return timings
+
+
+def end_timing() -> None:
+    _timings.set(None)
+
+
+@contextmanager
+def span(name: str):
+    """Adds the time of the block to the named span; nested blocks count once."""
+    timings = _timings.get()
+    if timings is None or name in timings.running:
+        yield
+        return
+    timings.running.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.spans[name] += time.perf_counter() - started
+        timings.running.discard(name)
+
+
+def record_query(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # First in the list: connection.execute_wrapper() pops the last one.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def log_timings(request, response, timings: RequestTimings) -> None:
+    total = time.perf_counter() - timings.started
+    response["Server-Timing"] = timings.server_timing(total)
+    match = request.resolver_match
+    record = {
+        "url_name": match.view_name if match else None,
+        "method": request.method,
+        "status": response.status_code,
+        **timings.as_log(total),
+    }
+    logger.info(json.dumps(record, ensure_ascii=False), extra={"timing": record})
+
+
+class TimedSerializerMixin:
+    """Counts to_representation() of the serializer as the serialize span."""
+
+    def to_representation(self, instance):
+        with span("serialize"):
+            return super().to_representation(instance)
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with span("template"):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, timing renders as the template span."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
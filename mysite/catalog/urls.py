@@ -6,6 +6,7 @@ from . import views
 router = routers.SimpleRouter()
 router.register(r"book", views.BookViewSet)
 router.register(r"book_relation", views.UserBookRelationView)
+router.register(r"overdue_loans", views.OverdueLoanViewSet, basename="overdue-loan")
 
 urlpatterns = [
     path("", views.index, name="index"),
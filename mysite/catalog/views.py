@@ -1,4 +1,6 @@
+from functools import partial
 from typing import Any
+from django.db.models import Count, Prefetch
 from django.db.models.query import QuerySet
 from django.shortcuts import render
 from django.http import (
@@ -19,39 +21,109 @@ from django.shortcuts import redirect, get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse, reverse_lazy
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
+from rest_framework.generics import get_object_or_404 as get_object_or_404_api
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.filters import OrderingFilter
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.mixins import UpdateModelMixin
-from django.db.models import Count, Case, When, Avg
 
 from .models import Book, Author, BookInstance, UserBookRelation
 from .forms import AddAuthorForm, EditAuthorForm  # , BookModelForm
-from .serializers import BookSerializer, UserBookRelationSerializer
+from .serializers import (
+    READERS_PREVIEW,
+    BookReaderSerializer,
+    BookSerializer,
+    OverdueLoanSerializer,
+    RelationRowSerializer,
+    UserBookRelationSerializer,
+    add_loan_names,
+    reader_relations,
+    readers_prefetch,
+)
 from .permisions import IsOwnerOrStaffOrReadOnly
+from .pagination import KeysetPagination, OverdueLoanPagination
+from .cache import CachedResponseMixin, get_stats
+from .dbstats import get_db_stats
+from .conditional import ConditionalGetMixin, book_page_validators, conditional_response
+from .search import BookSearchFilter
+from .loginc import (
+    RELATION_DEFAULTS,
+    RELATION_FIELDS,
+    bulk_upsert_relations,
+    save_relation,
+)
+from .export import CONTENT_TYPES, export_response
+from .payload import PayloadResponseMixin
+from .stats import index_stats
 
 
-class BookViewSet(ModelViewSet):
+class BookViewSet(
+    ConditionalGetMixin, CachedResponseMixin, PayloadResponseMixin, ModelViewSet
+):
     queryset = (
-        Book.objects.annotate(
-            annotated_likes=Count(Case(When(userbookrelation__like=True, then=1))),
-            # rating=Avg("userbookrelation__rate"),
-        )
-        .select_related("owner")
-        .prefetch_related("readers")
+        Book.objects.select_related("owner")
+        .defer("search_vector")
         .order_by("id")
     )
     serializer_class = BookSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, BookSearchFilter, OrderingFilter]
     permission_classes = [IsOwnerOrStaffOrReadOnly]
     filterset_fields = ["price"]
-    search_fields = ["price", "title"]
     ordering_fields = ["title", "year"]
+    export_chunk_size = 2000
+    readers_preview_max = 20
+
+    def get_readers_preview(self) -> int:
+        try:
+            limit = int(self.request.query_params["readers_preview"])
+        except (AttributeError, KeyError, ValueError):
+            return READERS_PREVIEW
+        return max(0, min(limit, self.readers_preview_max))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        limit = self.get_readers_preview()
+        # The default preview is part of the stored payloads (see PayloadResponseMixin).
+        if limit and limit != READERS_PREVIEW:
+            queryset = queryset.prefetch_related(readers_prefetch(limit))
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["readers_preview"] = self.get_readers_preview()
+        return context
 
     def perform_create(self, serializer):
         serializer.validated_data["owner"] = self.request.user
         serializer.save()
 
+    @action(detail=False, permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        return Response(get_stats())
+
+    @action(detail=False, permission_classes=[IsAdminUser])
+    def db_stats(self, request):
+        return Response(get_db_stats())
+
+    @action(detail=True)
+    def readers(self, request, pk=None):
+        get_object_or_404_api(Book.objects.only("pk"), pk=pk)
+        page = self.paginate_queryset(reader_relations().filter(book_id=pk))
+        users = [relation.user for relation in page]
+        serializer = BookReaderSerializer(users, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False)
+    def export(self, request):
+        output = request.query_params.get("output", "ndjson")
+        if output not in CONTENT_TYPES:
+            raise ValidationError({"output": list(CONTENT_TYPES)})
+        return export_response(output, self.export_chunk_size)
+
 
 class UserBookRelationView(UpdateModelMixin, GenericViewSet):
     permission_classes = [IsAuthenticated]
@@ -59,33 +131,57 @@ class UserBookRelationView(UpdateModelMixin, GenericViewSet):
     serializer_class = UserBookRelationSerializer
     lookup_field = "book"
 
-    def get_object(self):
-        obj, _ = UserBookRelation.objects.get_or_create(
-            user=self.request.user,
-            book_id=self.kwargs["book"],
+    bulk_max_rows = 10000
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop("partial", False)
+        serializer = self.get_serializer(data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        values = {} if partial else dict(RELATION_DEFAULTS)
+        values.update(
+            (field, value)
+            for field, value in serializer.validated_data.items()
+            if field in RELATION_FIELDS
+        )
+        book_id = kwargs["book"]
+        relation = None
+        if book_id.isdigit():
+            relation = save_relation(request.user.pk, int(book_id), values)
+        if relation is None:
+            raise NotFound()
+        return Response(self.get_serializer(relation).data)
+
+    @action(detail=False, methods=["post"], permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        serializer = RelationRowSerializer(
+            data=request.data, many=True, max_length=self.bulk_max_rows
         )
-        return obj
+        serializer.is_valid(raise_exception=True)
+        return Response(bulk_upsert_relations(serializer.validated_data))
+
+
+class OverdueLoanViewSet(GenericViewSet):
+    permission_classes = [IsAdminUser]
+    serializer_class = OverdueLoanSerializer
+    pagination_class = OverdueLoanPagination
+
+    def get_queryset(self):
+        return BookInstance.objects.overdue_loans()
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(add_loan_names(page), many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 def index(request: HttpRequest) -> HttpResponse:
     text_head = "На нашем сайте вы можете получить книги в электронном виде"
-    books = Book.objects.all()
-    num_books = Book.objects.all().count()
-    num_instances = BookInstance.objects.all().count()
-    num_instances_available = BookInstance.objects.filter(status__exact=2).count()
-    authors = Author.objects.all()
-    num_authors = Author.objects.all().count()
     # num_visits = request.session.get("num_visits", 0)
     # request.session["num_visits"] = num_visits + 1
 
     context = {
         "text_head": text_head,
-        "books": books,
-        "num_books": num_books,
-        "num_instances": num_instances,
-        "num_instances_available": num_instances_available,
-        "authors": authors,
-        "num_authors": num_authors,
+        **index_stats(),
         # "num_visits": num_visits,
     }
     return render(request, "catalog/index.html", context=context)
@@ -212,17 +308,56 @@ class BookDelete(DeleteView):
 
 class BookListView(ListView):
     model = Book
+    queryset = (
+        Book.objects.select_related("genre")
+        .defer("search_vector", "payload_json")
+        .order_by("id")
+    )
     context_object_name = "books"
     paginate_by = 3
 
 
 class BookDetailView(DetailView):
     model = Book
+    queryset = (
+        Book.objects.select_related("genre", "language", "publisher")
+        .defer("search_vector", "payload_json")
+        .prefetch_related(
+            Prefetch(
+                "author",
+                queryset=Author.objects.only("pk", "first_name", "last_name").order_by(
+                    "pk"
+                ),
+            ),
+            Prefetch(
+                "bookinstance_set",
+                queryset=BookInstance.objects.select_related("status"),
+            ),
+        )
+    )
     context_object_name = "book"
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["status_counts"] = (
+            BookInstance.objects.filter(book=self.object)
+            .values("status__name")
+            .annotate(count=Count("pk"))
+            .order_by("status__name")
+        )
+        return context
+
+    def get(self, request, *args, **kwargs):
+        handler = partial(super().get, request, *args, **kwargs)
+        validators = book_page_validators(kwargs["pk"], request.user)
+        if validators is None:
+            return handler()
+        return conditional_response(request, *validators, handler)
+
 
 class AuthorListView(ListView):
     model = Author
+    queryset = Author.objects.order_by("id")
     paginate_by = 4
 
 
@@ -239,5 +374,6 @@ class LoanedBooksByUserListView(LoginRequiredMixin, ListView):
         return (
             BookInstance.objects.filter(borrower=self.request.user)
             .filter(status__exact="2")
+            .select_related("book")
             .order_by("due_back")
         )
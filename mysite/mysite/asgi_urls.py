@@ -0,0 +1,17 @@
+"""
+URL configuration used by the ASGI application: the catalog read
+endpoints are served by async views, everything else as in mysite.urls.
+"""
+
+from django.urls import path
+
+from catalog import async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path("book/", async_views.book_list, name="book-list"),
+    path("book/<int:pk>/", async_views.book_detail, name="book-detail"),
+    path("book/<int:pk>/readers/", async_views.book_readers, name="book-readers"),
+    *sync_urlpatterns,
+]
@@ -42,12 +42,14 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "django_cleanup",
     "rest_framework",
     'django_filters',
 ]
 
 MIDDLEWARE = [
+    "catalog.middleware.TimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -55,13 +57,16 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "catalog.middleware.ReplicaMiddleware",
 ]
 
-ROOT_URLCONF = "mysite.urls"
+# mysite/asgi.py switches to mysite.asgi_urls (async catalog reads).
+ROOT_URLCONF = os.environ.get("DJANGO_ROOT_URLCONF", "mysite.urls")
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates that reports render time to catalog.timing.
+        "BACKEND": "catalog.timing.DjangoTemplates",
         "DIRS": [
             BASE_DIR / "templates",
         ],
@@ -83,17 +88,78 @@ WSGI_APPLICATION = "mysite.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+DB_POOL_SIZE = int(os.environ.get("DJANGO_DB_POOL_SIZE", 0))
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": (
+            "catalog.backends.pooled"
+            if DB_POOL_SIZE
+            else "django.db.backends.postgresql_psycopg2"
+        ),
         "NAME": "site_db",
         "USER": "botalov",
         "PASSWORD": "botalov",
         "HOST": "localhost",
         "PORT": 5430,
+        # Without a pool: keep connections open between requests for this many
+        # seconds, checking them before reuse. With a pool leave it at 0, so
+        # every request hands its connection back.
+        "CONN_MAX_AGE": int(os.environ.get("DJANGO_DB_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": os.environ.get("DJANGO_DB_CONN_HEALTH_CHECKS", "1") == "1",
+        "POOL": {
+            "max_size": DB_POOL_SIZE,
+            "timeout": float(os.environ.get("DJANGO_DB_POOL_TIMEOUT", 10)),
+            "check_after": float(os.environ.get("DJANGO_DB_POOL_CHECK_AFTER", 30)),
+        },
+    }
+}
+
+# Read replicas of the default database, e.g.
+# DJANGO_DB_REPLICAS="replica1:5432,replica2:5432". An entry may name another
+# database ("localhost:5430/site_db_replica") to try it out locally. Tests
+# run them as mirrors of the default test database.
+REPLICA_ADDRESSES = os.environ.get("DJANGO_DB_REPLICAS", "")
+for index, address in enumerate(filter(None, REPLICA_ADDRESSES.split(","))):
+    location, _, name = address.partition("/")
+    host, _, port = location.partition(":")
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "HOST": host or DATABASES["default"]["HOST"],
+        "PORT": port or DATABASES["default"]["PORT"],
+        "NAME": name or DATABASES["default"]["NAME"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["catalog.routers.ReplicaRouter"]
+TEST_RUNNER = "catalog.tests.runner.CatalogTestRunner"
+CATALOG_DB_REPLICAS = [alias for alias in DATABASES if alias.startswith("replica_")]
+# Whether safe requests read from the replicas at all. The test runner turns
+# it off, as a mirror does not see the data of a test; a test case that
+# exercises the replicas opts in with override_settings().
+CATALOG_REPLICA_READS = True
+# How long a client keeps reading from the primary after its write.
+CATALOG_REPLICA_PIN_SECONDS = int(os.environ.get("DJANGO_DB_REPLICA_PIN_SECONDS", 5))
+
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", "catalog"),
     }
 }
 
+CATALOG_CACHE_ALIAS = "default"
+CATALOG_CACHE_TIMEOUT = int(os.environ.get("CATALOG_CACHE_TIMEOUT", 300))
+
+# Share of requests timed by catalog.middleware.TimingMiddleware.
+CATALOG_TIMING_SAMPLE_RATE = float(os.environ.get("CATALOG_TIMING_SAMPLE_RATE", 0.05))
+
+# Worker processes for photo variants; 0 renders them in the committing thread.
+CATALOG_IMAGE_WORKERS = int(os.environ.get("CATALOG_IMAGE_WORKERS", 2))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -151,5 +217,7 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PARSER_CLASSES': (
         'rest_framework.parsers.JSONParser',
-    )
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'catalog.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get("DJANGO_API_PAGE_SIZE", 20)),
 }